@@ -0,0 +1,159 @@
+"""Прогон горячих видов с замером задержки, SQL и памяти.
+
+Запросы идут либо через django.test.Client, либо напрямую в
+WSGIHandler (как от gunicorn, без обвязки тестового клиента). Сценарий
+cold очищает кэш перед каждым запросом, warm -- только прогревает.
+"""
+import math
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def percentile(values, q):
+    """Процентиль по ближайшему рангу."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def targets():
+    """URL видов на самых нагруженных объектах базы и их читатель."""
+    busy_author = (
+        Post.objects.values('author__username').annotate(n=Count('id'))
+        .order_by('-n').values_list('author__username', flat=True).first()
+    )
+    group = (
+        Group.objects.annotate(n=Count('posts')).order_by('-n')
+        .values_list('slug', flat=True).first()
+    )
+    post = (
+        Comment.objects.values('post').annotate(n=Count('id'))
+        .order_by('-n').values_list('post', flat=True).first()
+    ) or Post.objects.values_list('id', flat=True).first()
+    reader = (
+        Follow.objects.values('user').annotate(n=Count('id'))
+        .order_by('-n').values_list('user', flat=True).first()
+    )
+    urls = {'posts:index': reverse('posts:index')}
+    if group:
+        urls['posts:group_list'] = reverse('posts:group_list', args=[group])
+    if busy_author:
+        urls['posts:profile'] = reverse('posts:profile', args=[busy_author])
+    if post:
+        urls['posts:post_detail'] = reverse('posts:post_detail', args=[post])
+    if reader:
+        urls['posts:follow_index'] = reverse('posts:follow_index')
+    return urls, reader
+
+
+class ClientHarness:
+    name = 'client'
+
+    def __init__(self, reader_id=None):
+        self.client = Client()
+        if reader_id:
+            self.client.force_login(User.objects.get(pk=reader_id))
+
+    def get(self, url):
+        response = self.client.get(url)
+        return response.status_code
+
+
+class WSGIHarness(ClientHarness):
+    """Вызывает WSGIHandler без тестового клиента; сессия -- из Client."""
+    name = 'wsgi'
+
+    def __init__(self, reader_id=None):
+        super().__init__(reader_id)
+        self.handler = WSGIHandler()
+        self.factory = RequestFactory()
+        self.cookie = self.client.cookies.output(
+            attrs=[], header='', sep=';').strip()
+
+    def get(self, url):
+        environ = self.factory.get(url).environ
+        if self.cookie:
+            environ['HTTP_COOKIE'] = self.cookie
+        status = []
+        body = self.handler(
+            environ, lambda code, headers, *args: status.append(code))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return int(status[0].split()[0])
+
+
+HARNESSES = {harness.name: harness for harness in (ClientHarness, WSGIHarness)}
+
+
+def measure(harness, url, requests, cold=False, memory_requests=3):
+    timings = []
+    queries = []
+    statuses = set()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            statuses.add(harness.get(url))
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    peaks = []
+    for _ in range(memory_requests):
+        if cold:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            harness.get(url)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return {
+        'url': url,
+        'requests': requests,
+        'statuses': sorted(statuses),
+        'mean_ms': sum(timings) / len(timings),
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings),
+        'queries_avg': sum(queries) / len(queries),
+        'queries_max': max(queries),
+        'memory_peak_kib': max(peaks) / 1024 if peaks else None,
+    }
+
+
+def run(harness_name='client', scenarios=('cold', 'warm'), requests=50,
+        warmup=5, memory_requests=3, views=None):
+    urls, reader = targets()
+    results = {}
+    for scenario in scenarios:
+        cold = scenario == 'cold'
+        results[scenario] = {}
+        for view, url in urls.items():
+            if views and view not in views:
+                continue
+            harness = HARNESSES[harness_name](
+                reader if view == 'posts:follow_index' else None)
+            for _ in range(warmup):
+                harness.get(url)
+            results[scenario][view] = measure(
+                harness, url, requests, cold, memory_requests)
+    return results
@@ -0,0 +1,174 @@
+"""Пропускная способность WSGI и ASGI под одновременными клиентами.
+
+База в проде далеко, поэтому каждому SQL-запросу добавляется задержка
+slow_queries: так видно, сколько запрос вида ждёт ввода-вывода, а не
+сколько стоит SQLite в памяти. Кэш на время прогона выключен, иначе
+после первого запроса база не нужна вовсе.
+
+wsgi -- пул из threads потоков, как gunicorn --threads; asgi -- цикл
+событий с core.asgi.WSGIToASGI с тем же числом потоков. Клиенты
+замкнутые: каждый шлёт следующий запрос, получив ответ на предыдущий.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.backends import utils
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from core.asgi import WSGIToASGI
+
+from .harness import ClientHarness, percentile
+
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@contextmanager
+def slow_queries(latency):
+    """Добавляет latency секунд к каждому SQL-запросу во всех потоках."""
+    execute = utils.CursorWrapper.execute
+    executemany = utils.CursorWrapper.executemany
+
+    def slow_execute(self, sql, params=None):
+        time.sleep(latency)
+        return execute(self, sql, params)
+
+    def slow_executemany(self, sql, param_list):
+        time.sleep(latency)
+        return executemany(self, sql, param_list)
+
+    utils.CursorWrapper.execute = slow_execute
+    utils.CursorWrapper.executemany = slow_executemany
+    try:
+        yield
+    finally:
+        utils.CursorWrapper.execute = execute
+        utils.CursorWrapper.executemany = executemany
+
+
+def _cookie(reader_id):
+    client = ClientHarness(reader_id).client
+    return client.cookies.output(attrs=[], header='', sep=';').strip()
+
+
+def _wsgi_requests(handler, urls, requests, concurrency, threads, cookie):
+    factory = RequestFactory()
+    server = ThreadPoolExecutor(max_workers=threads)
+    timings = []
+    statuses = set()
+    lock = threading.Lock()
+
+    def serve(url):
+        environ = factory.get(url).environ
+        if cookie:
+            environ['HTTP_COOKIE'] = cookie
+        status = []
+        body = handler(
+            environ, lambda code, headers, *args: status.append(code))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return int(status[0].split()[0])
+
+    def client(number):
+        for index in range(number, requests, concurrency):
+            started = time.perf_counter()
+            code = server.submit(serve, urls[index % len(urls)]).result()
+            with lock:
+                timings.append(time.perf_counter() - started)
+                statuses.add(code)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(client, range(concurrency)))
+    server.shutdown()
+    return timings, statuses
+
+
+def _scope(url, cookie):
+    parts = urlsplit(url)
+    headers = [(b'host', b'testserver')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode('latin1')))
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def _asgi_requests(handler, urls, requests, concurrency, threads, cookie):
+    application = WSGIToASGI(handler, workers=threads)
+    timings = []
+    statuses = set()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def call(url):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await application(_scope(url, cookie), receive, send)
+        return messages[0]['status']
+
+    async def client(number):
+        for index in range(number, requests, concurrency):
+            started = time.perf_counter()
+            statuses.add(await call(urls[index % len(urls)]))
+            timings.append(time.perf_counter() - started)
+
+    async def main():
+        await asyncio.gather(*(client(n) for n in range(concurrency)))
+
+    try:
+        asyncio.run(main())
+    finally:
+        application.executor.shutdown()
+    return timings, statuses
+
+
+DEPLOYMENTS = {'wsgi': _wsgi_requests, 'asgi': _asgi_requests}
+
+
+def run(deployment, urls, requests=200, concurrency=16, threads=8,
+        latency=0.005, view_workers=0, reader_id=None):
+    """Прогоняет requests запросов по кругу urls и считает req/s и задержку."""
+    cookie = _cookie(reader_id) if reader_id else ''
+    # обработчик строится до подмены кэша: core.perf оборачивает те
+    # бэкенды кэша, что настроены при первой сборке middleware
+    handler = WSGIHandler()
+    with override_settings(CACHES=DUMMY_CACHES, VIEW_WORKERS=view_workers):
+        with slow_queries(latency):
+            started = time.perf_counter()
+            timings, statuses = DEPLOYMENTS[deployment](
+                handler, urls, requests, concurrency, threads, cookie)
+            elapsed = time.perf_counter() - started
+    timings = [timing * 1000 for timing in timings]
+    return {
+        'deployment': deployment,
+        'view_workers': view_workers,
+        'requests': len(timings),
+        'statuses': sorted(statuses),
+        'throughput_rps': len(timings) / elapsed,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'max_ms': max(timings),
+    }
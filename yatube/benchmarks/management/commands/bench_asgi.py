@@ -0,0 +1,96 @@
+import json
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from benchmarks import harness, load
+from benchmarks.seed import seed
+from posts.models import Post
+
+COLUMNS = ('throughput_rps', 'p50_ms', 'p95_ms', 'max_ms')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI под одновременными '
+        'клиентами при медленной базе, с VIEW_WORKERS и без'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=5000,
+            help='сколько постов должно быть в базе перед замером')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--view', action='append', dest='views',
+                            help='по умолчанию posts:profile')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='потоков сервера, одинаково для WSGI и ASGI')
+        parser.add_argument(
+            '--latency', type=float, default=10.0,
+            help='задержка каждого SQL-запроса, мс')
+        parser.add_argument(
+            '--view-workers', type=int, default=4,
+            help='VIEW_WORKERS во втором прогоне каждого развёртывания')
+        parser.add_argument('--output', help='куда записать JSON')
+
+    def handle(self, *args, **options):
+        missing = options['posts'] - Post.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Создаём {missing} постов...')
+            seed(
+                users=options['users'], groups=options['groups'],
+                posts=missing, comments=missing // 5,
+                follows=options['follows'],
+            )
+        urls, reader = harness.targets()
+        views = options['views'] or ['posts:profile']
+        selected = [url for view, url in urls.items() if view in views]
+        results = []
+        for deployment in sorted(load.DEPLOYMENTS, reverse=True):
+            for view_workers in (0, options['view_workers']):
+                results.append(load.run(
+                    deployment, selected,
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    threads=options['threads'],
+                    latency=options['latency'] / 1000,
+                    view_workers=view_workers,
+                    reader_id=reader,
+                ))
+        self.write_table(results)
+        if options['output']:
+            report = {'meta': self.meta(options, selected), 'results': results}
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def meta(self, options, urls):
+        return {
+            'started': timezone.now().isoformat(),
+            'urls': urls,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'threads': options['threads'],
+            'latency_ms': options['latency'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+        }
+
+    def write_table(self, results):
+        header = ('развёртывание', 'VIEW_WORKERS') + COLUMNS
+        self.stdout.write(' | '.join(header))
+        for row in results:
+            cells = [row['deployment'], str(row['view_workers'])] + [
+                f'{row[column]:.1f}' for column in COLUMNS]
+            if row['statuses'] != [200]:
+                cells.append(f'статусы {row["statuses"]}')
+            self.stdout.write(' | '.join(cells))
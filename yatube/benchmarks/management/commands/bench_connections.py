@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmarks import harness, load
+from benchmarks.seed import seed
+from benchmarks.throwaway import throwaway_database
+from core.database import pool
+from posts.models import Post
+
+COLUMNS = ('mean_ms', 'p50_ms', 'p95_ms', 'connects')
+POOL_ENGINE = 'core.database.backends.pool'
+
+
+class Command(BaseCommand):
+    help = (
+        'Мерит задержку запросов с новым соединением на каждый запрос, '
+        'с постоянными соединениями (CONN_MAX_AGE) и с пулом'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--throwaway', action='store_true',
+            help='поднять временный PostgreSQL (или SQLite в WAL), '
+                 'применить миграции и мерить на нём')
+        parser.add_argument(
+            '--pool', action='store_true',
+            help='с --throwaway: postgres+pool:// вместо postgres://')
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--view', action='append', dest='views',
+                            help='по умолчанию health и posts:index')
+
+    def handle(self, *args, **options):
+        if options['throwaway']:
+            return self.run_throwaway(options)
+        missing = options['posts'] - Post.objects.count()
+        if missing > 0:
+            seed(users=50, groups=5, posts=missing, comments=missing // 5,
+                 follows=5)
+        urls, reader = harness.targets()
+        urls['health'] = reverse('health')
+        selected = [
+            url for view, url in urls.items()
+            if view in (options['views'] or ('health', 'posts:index'))
+        ]
+        engine = settings.DATABASES['default']['ENGINE']
+        modes = {'per-request': 0, 'persistent': None}
+        if engine == POOL_ENGINE:
+            modes = {'pooled': 0}
+        self.stdout.write(f'{engine}; ' + ', '.join(selected))
+        self.stdout.write(' | '.join(('режим',) + COLUMNS))
+        for mode, max_age in modes.items():
+            row = self.measure(selected, options['requests'], max_age)
+            cells = [mode] + [
+                f'{row[column]:.2f}' for column in COLUMNS[:-1]]
+            cells.append(str(row['connects']))
+            if row['statuses'] != [200]:
+                cells.append(f'статусы {row["statuses"]}')
+            self.stdout.write(' | '.join(cells))
+        if pool.get('default') is not None:
+            self.stdout.write(f'пул: {pool.get("default").stats()}')
+
+    def measure(self, urls, requests, max_age):
+        """Запросы подряд с CONN_MAX_AGE = max_age; кэш выключен."""
+        connects = []
+
+        def count(sender, **kwargs):
+            connects.append(1)
+
+        previous = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        if not connection.in_atomic_block:
+            connection.close()
+        connection_created.connect(count)
+        timings = []
+        statuses = set()
+        client = harness.WSGIHarness()
+        try:
+            with override_settings(CACHES=load.DUMMY_CACHES):
+                for index in range(requests):
+                    started = time.perf_counter()
+                    statuses.add(client.get(urls[index % len(urls)]))
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count)
+            connection.settings_dict['CONN_MAX_AGE'] = previous
+        return {
+            'statuses': sorted(statuses),
+            'mean_ms': sum(timings) / len(timings),
+            'p50_ms': harness.percentile(timings, 50),
+            'p95_ms': harness.percentile(timings, 95),
+            'connects': len(connects),
+        }
+
+    def run_throwaway(self, options):
+        """Повторяет команду в дочернем процессе на временной базе."""
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        arguments = [
+            '--posts', str(options['posts']),
+            '--requests', str(options['requests']),
+        ]
+        for view in options['views'] or ():
+            arguments += ['--view', view]
+        with throwaway_database(pool=options['pool']) as url:
+            self.stdout.write(f'DATABASE_URL={url}')
+            environment = dict(os.environ, DATABASE_URL=url)
+            for command in (['migrate', '-v', '0'],
+                            ['bench_connections'] + arguments):
+                result = subprocess.run(
+                    [sys.executable, manage] + command, env=environment,
+                    stdout=subprocess.PIPE, universal_newlines=True)
+                self.stdout.write(result.stdout, ending='')
+                if result.returncode:
+                    raise CommandError(f'{command[0]} завершилась с ошибкой')
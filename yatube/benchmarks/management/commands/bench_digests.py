@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test.utils import override_settings
+
+from benchmarks.seed import seed_follows, seed_posts, seed_users
+from posts import digest
+from posts.models import Digest
+
+User = get_user_model()
+
+PREFIX = 'digest'
+COLUMNS = ('emails', 'compose_s', 'send_s', 'emails_per_s')
+
+
+class Command(BaseCommand):
+    help = (
+        'Мерит рассылку писем подписчикам в filebased-бэкенд: письмо за '
+        'письмом через новое соединение и пачками через одно; '
+        'send_digests -- весь проход с отметками в базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--batch', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = seed_users(options['readers'], prefix=PREFIX)
+        User.objects.filter(pk__in=user_ids, email='').update(
+            email=Concat('username', Value('@example.com')))
+        seed_follows(options['follows'], user_ids)
+        # посты за последний день; окно письма -- двое суток
+        seed_posts(options['posts'], user_ids, [], days=1)
+        window = 2 * 24 * 60 * 60
+        path = tempfile.mkdtemp(prefix='yatube-mail-')
+        self.stdout.write(' | '.join(('режим',) + COLUMNS))
+        try:
+            with override_settings(
+                    EMAIL_BACKEND=(
+                        'django.core.mail.backends.filebased.EmailBackend'),
+                    EMAIL_FILE_PATH=path):
+                for mode in ('per-email', 'batched', 'send_digests'):
+                    Digest.objects.filter(user_id__in=user_ids).delete()
+                    row = self.measure(mode, window, options['batch'])
+                    self.stdout.write(' | '.join(
+                        [mode, str(row['emails'])]
+                        + [f'{row[column]:.2f}' for column in COLUMNS[1:3]]
+                        + [f'{row["emails_per_s"]:.0f}']))
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def measure(self, mode, window, batch):
+        """Письма собираются заранее, чтобы замер send_s был только отправкой.
+
+        emails_per_s -- по send_s, а для send_digests -- по всему проходу.
+        """
+        if mode == 'send_digests':
+            started = time.perf_counter()
+            emails = digest.send(window, batch)
+            seconds = time.perf_counter() - started
+            return {
+                'emails': emails, 'compose_s': 0.0, 'send_s': seconds,
+                'emails_per_s': emails / seconds if seconds else 0.0,
+            }
+        started = time.perf_counter()
+        batches = [messages for messages, _ in digest.batches(window, batch)]
+        compose = time.perf_counter() - started
+        started = time.perf_counter()
+        emails = 0
+        if mode == 'batched':
+            with get_connection() as connection:
+                for messages in batches:
+                    emails += connection.send_messages(messages) or 0
+        else:
+            # как send_mail на каждое письмо: своё соединение на письмо
+            for message in (m for messages in batches for m in messages):
+                message.connection = get_connection()
+                emails += message.send()
+        seconds = time.perf_counter() - started
+        return {
+            'emails': emails, 'compose_s': compose, 'send_s': seconds,
+            'emails_per_s': emails / seconds if seconds else 0.0,
+        }
@@ -0,0 +1,66 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmarks import harness
+from benchmarks.seed import seed_users
+from jobs import queue
+from posts.models import Follow
+
+User = get_user_model()
+
+COLUMNS = ('p50_ms', 'p95_ms', 'worker_ms')
+
+
+class Command(BaseCommand):
+    help = (
+        'Мерит задержку post_create у авторов с разным числом подписчиков, '
+        'когда раскладка лент идёт в запросе (JOBS_EAGER) и в очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers', type=int, action='append',
+            help='подписчиков у автора; по умолчанию 0, 100 и 1000')
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(' | '.join(('подписчиков', 'режим') + COLUMNS))
+        for followers in options['followers'] or (0, 100, 1000):
+            for mode, eager in (('eager', True), ('queued', False)):
+                row = self.measure(followers, eager, options['requests'])
+                self.stdout.write(' | '.join(
+                    [str(followers), mode]
+                    + [f'{row[column]:.2f}' for column in COLUMNS]))
+
+    def measure(self, followers, eager, requests):
+        """Посты автора с followers подписчиками и разбор очереди после."""
+        mode = 'eager' if eager else 'queued'
+        author, _ = User.objects.get_or_create(
+            username=f'jobs_author_{followers}_{mode}')
+        Follow.objects.bulk_create((
+            Follow(user_id=user_id, author=author)
+            for user_id in seed_users(followers, prefix='jobs')
+        ), ignore_conflicts=True)
+        client = Client()
+        client.force_login(author)
+        url = reverse('posts:post_create')
+        timings = []
+        with override_settings(FOLLOW_TIMELINE=True, JOBS_EAGER=eager):
+            for number in range(requests):
+                started = time.perf_counter()
+                client.post(url, {'text': f'пост {number}'})
+                timings.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            while any(queue.work()):
+                pass
+            worker = (time.perf_counter() - started) * 1000
+        return {
+            'p50_ms': harness.percentile(timings, 50),
+            'p95_ms': harness.percentile(timings, 95),
+            'worker_ms': worker,
+        }
@@ -0,0 +1,174 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmarks import harness, load
+from benchmarks.seed import seed
+from posts.models import Post
+
+User = get_user_model()
+
+SQLITE_ENGINES = (
+    'django.db.backends.sqlite3', 'core.database.backends.sqlite')
+PROFILES = {
+    'default': '',
+    'tuned': '?pragmas=tuned',
+    'tuned-immediate': '?pragmas=tuned&transaction_mode=immediate',
+}
+COLUMNS = ('writes_per_s', 'reads_per_s', 'locked', 'write_p95_ms',
+           'read_p95_ms')
+# сколько ждать, пока поднимутся все процессы, с
+STARTUP = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Пишет посты и комментарии и читает ленты из нескольких процессов '
+        'в одну базу SQLite: настройки по умолчанию, pragmas=tuned и '
+        'он же с transaction_mode=immediate'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument(
+            '--profile', action='append', choices=sorted(PROFILES),
+            help='по умолчанию все')
+        # внутренние: роль дочернего процесса и общий момент старта
+        parser.add_argument(
+            '--role', choices=('seed', 'writer', 'reader'),
+            help='служебный параметр дочерних процессов')
+        parser.add_argument('--start-at', type=float)
+
+    def handle(self, *args, **options):
+        if options['role']:
+            return self.work(options)
+        if settings.DATABASES['default']['ENGINE'] not in SQLITE_ENGINES:
+            raise CommandError('Замер только для SQLite')
+        results = {}
+        for profile in options['profile'] or PROFILES:
+            results[profile] = self.run_profile(profile, options)
+        self.stdout.write(' | '.join(('профиль',) + COLUMNS))
+        for profile, row in results.items():
+            self.stdout.write(' | '.join(
+                [profile] + [f'{row[column]:.1f}' for column in COLUMNS]))
+
+    def run_profile(self, profile, options):
+        """Новая база, миграции, данные и одновременный прогон ролей."""
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        with tempfile.TemporaryDirectory(prefix='yatube-sqlite-') as path:
+            url = f'sqlite://{path}/db.sqlite3{PROFILES[profile]}'
+            environment = dict(os.environ, DATABASE_URL=url)
+
+            def command(*arguments):
+                return [sys.executable, manage, *arguments]
+
+            for arguments in (
+                    ('migrate', '-v', '0'),
+                    ('bench_sqlite', '--role', 'seed',
+                     '--posts', str(options['posts']))):
+                subprocess.run(command(*arguments), env=environment,
+                               check=True, stdout=subprocess.DEVNULL)
+            start_at = time.time() + STARTUP
+            roles = (['writer'] * options['writers']
+                     + ['reader'] * options['readers'])
+            workers = [
+                subprocess.Popen(
+                    command('bench_sqlite', '--role', role,
+                            '--start-at', str(start_at),
+                            '--seconds', str(options['seconds'])),
+                    env=environment, stdout=subprocess.PIPE,
+                    universal_newlines=True)
+                for role in roles
+            ]
+            reports = []
+            for worker in workers:
+                output, _ = worker.communicate()
+                if worker.returncode:
+                    raise CommandError('Процесс нагрузки завершился с ошибкой')
+                reports.append(json.loads(output.splitlines()[-1]))
+        seconds = options['seconds']
+
+        def total(role, field):
+            return sum(r[field] for r in reports if r['role'] == role)
+
+        def worst(role):
+            return max(
+                (r['p95_ms'] for r in reports if r['role'] == role),
+                default=0.0)
+
+        return {
+            'writes_per_s': total('writer', 'ops') / seconds,
+            'reads_per_s': total('reader', 'ops') / seconds,
+            'locked': sum(r['locked'] for r in reports),
+            'write_p95_ms': worst('writer'),
+            'read_p95_ms': worst('reader'),
+        }
+
+    def work(self, options):
+        role = options['role']
+        if role == 'seed':
+            seed(users=20, groups=3, posts=options['posts'],
+                 comments=options['posts'] // 5, follows=3)
+            return
+        if role == 'writer':
+            client = Client()
+            client.force_login(User.objects.create_user(
+                username=f'writer_{os.getpid()}'))
+            post_id = Post.objects.values_list('pk', flat=True).first()
+            requests = [
+                lambda n: client.post(
+                    reverse('posts:post_create'), {'text': f'пост {n}'}),
+                lambda n: client.post(
+                    reverse('posts:add_comment', args=[post_id]),
+                    {'text': f'комментарий {n}'}),
+            ]
+        else:
+            client = Client()
+            urls = [
+                url for view, url in harness.targets()[0].items()
+                if view != 'posts:follow_index'
+            ]
+            requests = [
+                lambda n, url=url: client.get(url) for url in urls]
+        # кэш выключен: читатели должны ходить в базу
+        with override_settings(CACHES=load.DUMMY_CACHES):
+            report = self.loop(requests, options)
+        report['role'] = role
+        self.stdout.write(json.dumps(report))
+
+    def loop(self, requests, options):
+        time.sleep(max(options['start_at'] - time.time(), 0))
+        deadline = options['start_at'] + options['seconds']
+        timings = []
+        locked = 0
+        number = 0
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                requests[number % len(requests)](number)
+            except OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                locked += 1
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+            number += 1
+        return {
+            'ops': len(timings),
+            'locked': locked,
+            'p95_ms': harness.percentile(timings, 95),
+        }
@@ -0,0 +1,114 @@
+import json
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks import harness
+from benchmarks.seed import seed
+from posts.models import Comment, Follow, Post, User
+
+COLUMNS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_avg', 'memory_peak_kib')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает index, group_posts, profile, post_detail и follow_index '
+        'и пишет p50/p95/p99, запросы к базе и память в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=100000,
+            help='сколько постов должно быть в базе перед замером')
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--follows', type=int, default=30)
+        parser.add_argument(
+            '--skip-seed', action='store_true',
+            help='не досоздавать данные, мерить то, что есть')
+        parser.add_argument(
+            '--harness', choices=sorted(harness.HARNESSES), default='wsgi')
+        parser.add_argument(
+            '--scenario', action='append', choices=('cold', 'warm'),
+            help='cold -- кэш чистится перед каждым запросом; '
+                 'по умолчанию оба')
+        parser.add_argument('--view', action='append', dest='views')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--memory-requests', type=int, default=3)
+        parser.add_argument('--output', help='куда записать JSON')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения p95')
+
+    def handle(self, *args, **options):
+        missing = options['posts'] - Post.objects.count()
+        if missing > 0 and not options['skip_seed']:
+            self.stdout.write(f'Создаём {missing} постов...')
+            started = time.perf_counter()
+            seed(
+                users=options['users'], groups=options['groups'],
+                posts=missing, comments=missing // 5,
+                follows=options['follows'],
+            )
+            self.stdout.write(f'за {time.perf_counter() - started:.1f} с')
+        results = harness.run(
+            harness_name=options['harness'],
+            scenarios=options['scenario'] or ('cold', 'warm'),
+            requests=options['requests'],
+            warmup=options['warmup'],
+            memory_requests=options['memory_requests'],
+            views=options['views'],
+        )
+        report = {'meta': self.meta(options), 'results': results}
+        previous = options['compare'] and self.load(options['compare'])
+        self.write_table(results, previous)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def meta(self, options):
+        return {
+            'started': timezone.now().isoformat(),
+            'harness': options['harness'],
+            'requests': options['requests'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'cache': settings.CACHES['default']['BACKEND'],
+            'follow_timeline': settings.FOLLOW_TIMELINE,
+            'rows': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        }
+
+    def load(self, path):
+        try:
+            with open(path) as previous:
+                return json.load(previous)['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+    def write_table(self, results, previous):
+        for scenario, views in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(scenario))
+            self.stdout.write(' | '.join(('вид',) + COLUMNS))
+            for view, row in views.items():
+                cells = [view] + [
+                    '-' if row[column] is None else f'{row[column]:.1f}'
+                    for column in COLUMNS
+                ]
+                old = (previous or {}).get(scenario, {}).get(view)
+                if old and old['p95_ms']:
+                    change = (row['p95_ms'] / old['p95_ms'] - 1) * 100
+                    cells.append(f'p95 {change:+.0f}%')
+                if row['statuses'] != [200]:
+                    cells.append(f'статусы {row["statuses"]}')
+                self.stdout.write(' | '.join(cells))
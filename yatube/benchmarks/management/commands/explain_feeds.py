@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from benchmarks.seed import seed
+from posts.models import Comment, Follow, Group, Post
+
+
+def _median_ms(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы и время горячих запросов лент '
+        'с составными индексами и без них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1000000,
+            help='сколько постов должно быть в базе перед замером')
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--follows', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--skip-seed', action='store_true',
+            help='не досоздавать данные, мерить то, что есть')
+
+    def handle(self, *args, **options):
+        missing = options['posts'] - Post.objects.count()
+        if missing > 0 and not options['skip_seed']:
+            self.stdout.write(f'Создаём {missing} постов...')
+            started = time.perf_counter()
+            created = seed(
+                users=options['users'], groups=options['groups'],
+                posts=missing, comments=missing // 5,
+                follows=options['follows'],
+            )
+            self.stdout.write(
+                f'{created} за {time.perf_counter() - started:.1f} с')
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        queries = self.hot_queries()
+        with transaction.atomic():
+            self.drop_indexes()
+            before = self.measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        # SQLite кэширует подготовленные EXPLAIN, сбрасываем соединение
+        connection.close()
+        after = self.measure(queries, options['repeat'])
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for title, (plan, timing) in (
+                ('без индексов', before[name]),
+                ('с индексами', after[name]),
+            ):
+                self.stdout.write(f'  {title}: {timing:.2f} мс')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+    def hot_queries(self):
+        feed = Post.objects.for_feed().order_by('-pub_date', '-pk')
+        busy_author = (
+            Post.objects.values('author').annotate(n=Count('id'))
+            .order_by('-n').values_list('author', flat=True).first()
+        )
+        reader = (
+            Follow.objects.values_list('user', flat=True).first()
+        )
+        group = Group.objects.values_list('id', flat=True).first()
+        post = (
+            Comment.objects.values('post').annotate(n=Count('id'))
+            .order_by('-n').values_list('post', flat=True).first()
+        )
+        total = Post.objects.count()
+        middle = feed[total // 2] if total else None
+        queries = {'index': feed[:11]}
+        if middle:
+            queries['index, глубокая страница'] = feed.filter(
+                pub_date__lte=middle.pub_date)[:11]
+        queries['profile'] = feed.filter(author=busy_author)[:11]
+        queries['group_posts'] = feed.filter(group=group)[:11]
+        queries['follow_index'] = feed.filter(
+            author__following__user=reader)[:11]
+        queries['post_detail, комментарии'] = Comment.objects.filter(
+            post=post).order_by('-created', '-pk')[:20]
+        queries['подписчики автора'] = Follow.objects.filter(
+            author=busy_author).values('user')[:100]
+        return queries
+
+    def measure(self, queries, repeat):
+        return {
+            name: (queryset.explain(), _median_ms(queryset, repeat))
+            for name, queryset in queries.items()
+        }
+
+    def drop_indexes(self):
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model in (Post, Comment, Follow):
+                for index in model._meta.indexes:
+                    cursor.execute(
+                        str(index.remove_sql(model, schema_editor)))
@@ -0,0 +1,150 @@
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Max
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import explicit_dates
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+PREFIX = 'bench'
+
+
+def _batches(objects, size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, objects, batch_size, **kwargs):
+    created = 0
+    for batch in _batches(objects, batch_size):
+        model.objects.bulk_create(batch, **kwargs)
+        created += len(batch)
+    return created
+
+
+def seed_users(number, prefix=PREFIX, batch_size=BATCH_SIZE):
+    """Создаёт пользователей prefix_0..prefix_N, существующие оставляет."""
+    password = make_password(None)
+    _bulk_insert(User, (
+        User(username=f'{prefix}_{n}', password=password)
+        for n in range(number)
+    ), batch_size, ignore_conflicts=True)
+    return list(
+        User.objects.filter(username__startswith=f'{prefix}_')
+        .values_list('id', flat=True)[:number]
+    )
+
+
+def seed_groups(number, prefix=PREFIX, batch_size=BATCH_SIZE):
+    _bulk_insert(Group, (
+        Group(
+            title=f'Группа {n}',
+            slug=f'{prefix}-{n}',
+            description=f'Описание группы {n}',
+        )
+        for n in range(number)
+    ), batch_size, ignore_conflicts=True)
+    return list(
+        Group.objects.filter(slug__startswith=f'{prefix}-')
+        .values_list('id', flat=True)[:number]
+    )
+
+
+def seed_posts(number, user_ids, group_ids, days=365, rng=random,
+               batch_size=BATCH_SIZE):
+    """Посты с датами, равномерно разбросанными по последним days дням.
+
+    Авторы выбираются со степенным перекосом: примерно половину постов
+    пишет десятая часть пользователей, как в живой базе.
+    """
+    now = timezone.now()
+    span = days * 24 * 60 * 60
+
+    def author():
+        return user_ids[int(len(user_ids) * rng.random() ** 3)]
+
+    with explicit_dates(Post, 'pub_date'):
+        return _bulk_insert(Post, (
+            Post(
+                author_id=author(),
+                group_id=(
+                    rng.choice(group_ids)
+                    if group_ids and rng.random() < 0.7 else None
+                ),
+                text=f'Синтетический пост {n}',
+                pub_date=now - timedelta(seconds=rng.randrange(span)),
+            )
+            for n in range(number)
+        ), batch_size)
+
+
+def seed_comments(number, user_ids, post_ids, rng=random,
+                  batch_size=BATCH_SIZE):
+    now = timezone.now()
+    with explicit_dates(Comment, 'created'):
+        return _bulk_insert(Comment, (
+            Comment(
+                author_id=rng.choice(user_ids),
+                post_id=rng.randint(*post_ids),
+                text=f'Синтетический комментарий {n}',
+                created=now - timedelta(seconds=rng.randrange(86400 * 30)),
+            )
+            for n in range(number)
+        ), batch_size)
+
+
+def seed_follows(per_user, user_ids, rng=random, batch_size=BATCH_SIZE):
+    per_user = min(per_user, len(user_ids) - 1)
+    return _bulk_insert(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rng.sample(user_ids, per_user)
+        if author_id != user_id
+    ), batch_size, ignore_conflicts=True)
+
+
+def seed(users=1000, groups=50, posts=10000, comments=0, follows=0,
+         batch_size=BATCH_SIZE, prefix=PREFIX, random_seed=0):
+    """Наполняет базу синтетическими данными через bulk_create.
+
+    follows -- сколько авторов читает каждый пользователь. Возвращает
+    словарь с числом созданных записей по типам. bulk_create не шлёт
+    сигналов, поэтому в конце пересчитываются счётчики авторов.
+    """
+    rng = random.Random(random_seed)
+    user_ids = seed_users(users, prefix, batch_size)
+    group_ids = seed_groups(groups, prefix, batch_size)
+    first_id = (Post.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    result = {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': seed_posts(
+            posts, user_ids, group_ids, rng=rng, batch_size=batch_size),
+    }
+    last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+    result['comments'] = (
+        seed_comments(
+            comments, user_ids, (first_id, last_id), rng=rng,
+            batch_size=batch_size)
+        if comments and last_id >= first_id else 0
+    )
+    result['follows'] = (
+        seed_follows(follows, user_ids, rng=rng, batch_size=batch_size)
+        if follows else 0
+    )
+    call_command('rebuild_author_stats', stdout=io.StringIO())
+    return result
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from jobs.models import Job
+
+from ..harness import percentile
+
+
+class PercentileTest(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+class BenchViewsCommandTest(TestCase):
+    def test_small_run_writes_json(self):
+        """Короткий прогон на маленькой базе пишет результаты в JSON"""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'bench_views', posts=30, users=5, groups=2, follows=2,
+            requests=2, warmup=0, memory_requests=1, harness='wsgi',
+            output=path, stdout=StringIO())
+        with open(path) as output:
+            report = json.load(output)
+        self.assertEqual(report['meta']['rows']['posts'], 30)
+        for scenario in ('cold', 'warm'):
+            rows = report['results'][scenario]
+            self.assertIn('posts:follow_index', rows)
+            for row in rows.values():
+                self.assertEqual(row['statuses'], [200])
+
+
+class BenchASGICommandTest(TransactionTestCase):
+    def test_small_run_writes_json(self):
+        """WSGI и ASGI с VIEW_WORKERS и без отвечают 200 на профиль"""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'bench_asgi', posts=30, users=5, groups=2, follows=2,
+            requests=4, concurrency=2, threads=2, latency=0,
+            view_workers=2, output=path, stdout=StringIO())
+        with open(path) as output:
+            report = json.load(output)
+        rows = report['results']
+        self.assertEqual(
+            [(row['deployment'], row['view_workers']) for row in rows],
+            [('wsgi', 0), ('wsgi', 2), ('asgi', 0), ('asgi', 2)])
+        for row in rows:
+            self.assertEqual(row['statuses'], [200])
+            self.assertEqual(row['requests'], 4)
+
+
+class BenchConnectionsCommandTest(TestCase):
+    # /health/ проверяет все базы, и реплику тестов тоже
+    databases = '__all__'
+
+    def test_small_run(self):
+        """Оба режима соединений отвечают 200"""
+        stdout = StringIO()
+        call_command(
+            'bench_connections', posts=20, requests=4, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        modes = [line.split(' | ')[0] for line in lines[2:4]]
+        self.assertEqual(modes, ['per-request', 'persistent'])
+        self.assertNotIn('статусы', stdout.getvalue())
+
+
+class BenchJobsCommandTest(TestCase):
+    def test_small_run(self):
+        """Оба режима на двух размерах аудитории, очередь разобрана"""
+        stdout = StringIO()
+        call_command(
+            'bench_jobs', followers=[0, 3], requests=2, stdout=stdout)
+        rows = [line.split(' | ') for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [row[:2] for row in rows[1:]],
+            [['0', 'eager'], ['0', 'queued'], ['3', 'eager'], ['3', 'queued']])
+        self.assertFalse(Job.objects.exists())
+
+
+class BenchDigestsCommandTest(TestCase):
+    def test_small_run(self):
+        """Все режимы отправляют одинаковое число писем"""
+        stdout = StringIO()
+        call_command(
+            'bench_digests', readers=5, follows=2, posts=20, batch=2,
+            stdout=stdout)
+        rows = [line.split(' | ') for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            ['per-email', 'batched', 'send_digests'])
+        self.assertEqual(len({row[1] for row in rows[1:]}), 1)
+        self.assertNotEqual(rows[1][1], '0')
@@ -0,0 +1,65 @@
+"""Временная база для замеров: локальный PostgreSQL или SQLite в WAL.
+
+PostgreSQL поднимается initdb и pg_ctl из PATH во временном каталоге,
+слушает только unix-сокет и удаляется на выходе. Если сервера или
+psycopg2 нет, вместо него -- временный файл SQLite в режиме WAL.
+"""
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+
+def postgres_available():
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        return False
+    return bool(shutil.which('initdb') and shutil.which('pg_ctl'))
+
+
+@contextmanager
+def _postgres(directory, pool):
+    data = os.path.join(directory, 'data')
+    subprocess.run(
+        ['initdb', '-D', data, '-A', 'trust', '-U', 'yatube', '--no-sync'],
+        check=True, stdout=subprocess.DEVNULL)
+    server_options = f"-k {directory} -c listen_addresses='' -c fsync=off"
+    subprocess.run(
+        ['pg_ctl', '-D', data, '-o', server_options, '-w', 'start',
+         '-l', os.path.join(directory, 'server.log')],
+        check=True, stdout=subprocess.DEVNULL)
+    scheme = 'postgres+pool' if pool else 'postgres'
+    try:
+        yield f'{scheme}://yatube@/postgres?host={directory}'
+    finally:
+        subprocess.run(
+            ['pg_ctl', '-D', data, '-m', 'fast', 'stop'],
+            stdout=subprocess.DEVNULL)
+
+
+@contextmanager
+def _sqlite(directory):
+    path = os.path.join(directory, 'db.sqlite3')
+    connection = sqlite3.connect(path)
+    # режим WAL запоминается в самом файле
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.close()
+    yield f'sqlite://{path}'
+
+
+@contextmanager
+def throwaway_database(pool=False):
+    """DATABASE_URL пустой базы, которая исчезнет после выхода."""
+    directory = tempfile.mkdtemp(prefix='yatube-db-')
+    try:
+        if postgres_available():
+            with _postgres(directory, pool) as url:
+                yield url
+        else:
+            with _sqlite(directory) as url:
+                yield url
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
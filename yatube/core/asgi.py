@@ -0,0 +1,176 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+В Django 2.2 нет собственного ASGI, поэтому запрос обрабатывается
+обычным WSGIHandler в пуле потоков: цикл событий сервера (uvicorn,
+daphne, hypercorn) только читает тело и отдаёт ответ. Медленный клиент
+занимает корутину, а не поток, поток держит лишь сам вид.
+
+Весь запрос -- от вызова вида до response.close() -- выполняется в
+одном потоке пула: соединения с базой в Django привязаны к потоку, а
+request_finished закрывает соединения того потока, где его послали.
+Потоковые ответы отдаются кусками через очередь ограниченной длины,
+так что вид не убегает вперёд медленного клиента.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+# тело больше этого размера во время чтения уходит во временный файл
+BODY_MEMORY_LIMIT = 1024 * 1024
+# сколько кусков потокового ответа может ждать отправки
+QUEUED_CHUNKS = 4
+
+_DONE = object()
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        # как и в WSGI-серверах, путь -- это байты запроса в latin1
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in result:
+            # повторённые заголовки склеиваются, как у WSGI-серверов
+            value = f'{result[name]},{value}'
+        result[name] = value
+    return result
+
+
+class WSGIToASGI:
+    """ASGI 3 приложение, которое вызывает WSGI-приложение в потоках.
+
+    workers -- размер пула, то есть сколько видов выполняется
+    одновременно (аналог --threads у gunicorn).
+    """
+
+    def __init__(self, wsgi_application, workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(QUEUED_CHUNKS)
+        worker = loop.run_in_executor(
+            self.executor, self.run, wsgi_environ(scope, body), queue,
+            loop)
+        try:
+            while True:
+                message = await queue.get()
+                if message is _DONE:
+                    break
+                await send(message)
+        except BaseException:
+            # отправить не удалось: дочитываем очередь, иначе поток пула
+            # навсегда повиснет на put
+            while await queue.get() is not _DONE:
+                pass
+            raise
+        finally:
+            await worker
+            body.close()
+
+    def run(self, environ, queue, loop):
+        """Выполняет WSGI-приложение в потоке пула и кладёт сообщения в queue.
+
+        Сообщения ASGI собираются здесь, цикл событий только пересылает
+        их серверу; put ждёт места в очереди, что даёт обратное давление.
+        """
+        def put(message):
+            future = asyncio.run_coroutine_threadsafe(queue.put(message), loop)
+            future.result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [{
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            }]
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                if getattr(result, 'streaming', True):
+                    put(started[0])
+                    for chunk in result:
+                        if chunk:
+                            put({
+                                'type': 'http.response.body',
+                                'body': chunk,
+                                'more_body': True,
+                            })
+                    body = b''
+                else:
+                    # обычный ответ отдаётся одним сообщением
+                    body = b''.join(result)
+                    put(started[0])
+            finally:
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+            put({'type': 'http.response.body', 'body': body})
+        finally:
+            put(_DONE)
@@ -0,0 +1,362 @@
+"""Бэкенды кэша для нескольких процессов.
+
+RespCache -- общий кэш на сервере с протоколом Redis. TieredCache
+держит перед общим кэшем короткоживущий кэш процесса (L1) и раз в
+SYNC_INTERVAL секунд читает из общего кэша журнал инвалидаций, удаляя
+из L1 ключи, перезаписанные другими процессами. Поэтому данные в L1
+отстают от общего кэша не больше чем на SYNC_INTERVAL, а при
+недоступном журнале -- на LOCAL_TIMEOUT.
+"""
+import os
+import pickle
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .resp import INCR_EXISTING, RespConnection
+
+_MISSING = object()
+
+
+def _dumps(value):
+    # целые храним числом, чтобы incr работал на сервере атомарно
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+class RespCache(BaseCache):
+    """Кэш на сервере с протоколом Redis: Redis, KeyDB или cache_server.
+
+    LOCATION -- 'host:port', номер базы задаётся OPTIONS['DB'].
+    Соединение своё у каждого потока (Django создаёт бэкенд на поток)
+    и не закрывается между запросами.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        host, _, port = server.rpartition(':')
+        self._address = (host or '127.0.0.1', int(port or 6379))
+        self._db = int(options.get('DB', 0))
+        self._socket_timeout = options.get('SOCKET_TIMEOUT', 1)
+        self._connection = None
+
+    def _execute_many(self, commands):
+        reused = self._connection is not None
+        if not reused:
+            self._connection = RespConnection(
+                *self._address, db=self._db, timeout=self._socket_timeout)
+        try:
+            return self._connection.execute_many(commands)
+        except OSError:
+            self.disconnect()
+            if not reused:
+                raise
+        # сервер мог перезапуститься и закрыть простаивавшее соединение
+        return self._execute_many(commands)
+
+    def _execute(self, *args):
+        return self._execute_many([args])[0]
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return []
+        return ['PX', max(int(timeout * 1000), 1)]
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        reply = self._execute(
+            'SET', key, _dumps(value), 'NX', *self._expiry(timeout))
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        return default if data is None else _loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None \
+                and timeout <= 0:
+            self._execute('DEL', key)
+            return
+        self._execute('SET', key, _dumps(value), *self._expiry(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry:
+            return bool(self._execute('PEXPIRE', key, expiry[1]))
+        self._execute('PERSIST', key)
+        return bool(self._execute('EXISTS', key))
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self._execute('MGET', *made)
+        return {
+            key: _loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        commands = [
+            ('SET', self._key(key, version), _dumps(value), *expiry)
+            for key, value in data.items()
+        ]
+        if commands:
+            self._execute_many(commands)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self._execute('EVAL', INCR_EXISTING, 1, key, delta)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение держим
+        pass
+
+    def disconnect(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+LOG = 'tiered:log'
+EPOCH = 'tiered:epoch'
+# отставание больше этого числа сообщений дешевле пережить очисткой L1
+MAX_LOG_READ = 1000
+
+_processes = {}
+_processes_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """Кэш процесса (L1) поверх общего кэша (L2) с журналом инвалидаций.
+
+    LOCATION -- алиас общего кэша в CACHES. Записи идут в оба уровня и
+    публикуются в журнал: счётчик LOG и сообщения LOG:<n> со списком
+    ключей. Чтение сначала догоняет журнал, затем смотрит L1, затем L2.
+    EPOCH меняется при clear() и при потере данных L2; другой EPOCH
+    означает, что журнал прерван, и L1 очищается целиком.
+
+    Журналу нужен атомарный incr, как у RespCache; с файловым кэшем
+    сообщения параллельных процессов могут теряться.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location or 'shared'
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 0.5))
+        self.log_timeout = int(options.get('LOG_TIMEOUT', 300))
+        name = options.get('LOCAL_NAME', f'tiered:{self.shared_alias}')
+        self.local = LocMemCache(name, {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': int(options.get('LOCAL_MAX_ENTRIES', 1000)),
+            },
+        })
+        # состояние синхронизации общее для всех потоков процесса
+        with _processes_lock:
+            self._state = _processes.setdefault((os.getpid(), name), {
+                'token': uuid4().hex,
+                'seen': None,
+                'epoch': None,
+                'synced': float('-inf'),
+                'lock': threading.Lock(),
+            })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _publish(self, keys):
+        shared = self.shared
+        try:
+            number = shared.incr(LOG)
+        except ValueError:
+            shared.add(LOG, 0, None)
+            number = shared.incr(LOG)
+        shared.set(
+            f'{LOG}:{number}', (self._state['token'], keys), self.log_timeout)
+
+    def _current_epoch(self, shared, epoch):
+        if epoch is None:
+            shared.add(EPOCH, uuid4().hex, None)
+            epoch = shared.get(EPOCH)
+        return epoch
+
+    def sync(self, force=False):
+        """Удаляет из L1 ключи, изменённые другими процессами."""
+        state = self._state
+        now = time.monotonic()
+        if not force and now - state['synced'] < self.sync_interval:
+            return
+        if not state['lock'].acquire(blocking=force):
+            # журнал уже читает соседний поток
+            return
+        try:
+            state['synced'] = now
+            shared = self.shared
+            found = shared.get_many([LOG, EPOCH])
+            number = found.get(LOG, 0)
+            epoch = self._current_epoch(shared, found.get(EPOCH))
+            seen = state['seen']
+            state['seen'] = number
+            if epoch != state['epoch']:
+                state['epoch'] = epoch
+                self.local.clear()
+                return
+            if number == seen:
+                return
+            if number < seen or number - seen > MAX_LOG_READ:
+                self.local.clear()
+                return
+            names = [f'{LOG}:{n}' for n in range(seen + 1, number + 1)]
+            messages = shared.get_many(names)
+            if len(messages) < len(names):
+                # сообщение истекло или ещё не записано: не угадываем
+                self.local.clear()
+                return
+            for token, keys in messages.values():
+                if token != state['token']:
+                    self.local.delete_many(keys)
+        finally:
+            state['lock'].release()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if not self.shared.add(key, value, timeout):
+            return False
+        self.local.set(key, value, self._local_timeout(timeout))
+        self._publish([key])
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        self.sync()
+        value = self.local.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.shared.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value, self._local_timeout(timeout))
+        self._publish([key])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self.local.touch(key, self._local_timeout(timeout))
+        return self.shared.touch(key, timeout)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self.shared.delete(key)
+        self.local.delete(key)
+        self._publish([key])
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        self.sync()
+        found = self.local.get_many(made)
+        missing = [key for key in made if key not in found]
+        if missing:
+            fetched = self.shared.get_many(missing)
+            self.local.set_many(fetched)
+            found.update(fetched)
+        return {made[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        data = {self._key(key, version): value for key, value in data.items()}
+        if not data:
+            return []
+        self.shared.set_many(data, timeout)
+        self.local.set_many(data, self._local_timeout(timeout))
+        self._publish(list(data))
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return
+        self.shared.delete_many(keys)
+        self.local.delete_many(keys)
+        self._publish(keys)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        self.sync()
+        return self.local.has_key(key) or self.shared.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self.shared.incr(key, delta)
+        self.local.set(key, value)
+        self._publish([key])
+        return value
+
+    def clear(self):
+        shared = self.shared
+        shared.clear()
+        epoch = uuid4().hex
+        shared.set(EPOCH, epoch, None)
+        self.local.clear()
+        self._state['epoch'] = epoch
+        self._state['seen'] = 0
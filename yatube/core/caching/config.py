@@ -0,0 +1,52 @@
+"""Настройка CACHES по переменной окружения CACHE_URL.
+
+Модуль не импортирует Django, поэтому его можно звать из settings.
+
+    locmem://                          кэш процесса (по умолчанию)
+    file:///var/tmp/yatube-cache       L1 + общий файловый кэш
+    resp://127.0.0.1:6379/0            L1 + Redis или cache_server
+
+Параметры L1 передаются в строке запроса:
+resp://host:6379/0?local_timeout=5&sync_interval=0.5
+"""
+from urllib.parse import parse_qsl, urlsplit
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+TIERED_OPTIONS = {
+    'local_timeout': 'LOCAL_TIMEOUT',
+    'sync_interval': 'SYNC_INTERVAL',
+    'local_max_entries': 'LOCAL_MAX_ENTRIES',
+    'log_timeout': 'LOG_TIMEOUT',
+}
+
+
+def cache_config(url):
+    parts = urlsplit(url or 'locmem://')
+    query = dict(parse_qsl(parts.query))
+    if parts.scheme == 'locmem':
+        return {'default': {'BACKEND': LOCMEM}}
+    if parts.scheme == 'file':
+        shared = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': parts.path,
+        }
+    elif parts.scheme in ('resp', 'redis'):
+        shared = {
+            'BACKEND': 'core.caching.backends.RespCache',
+            'LOCATION': parts.netloc,
+            'OPTIONS': {'DB': int(parts.path.strip('/') or 0)},
+        }
+    else:
+        raise ValueError(f'Неизвестная схема CACHE_URL: {url}')
+    options = {
+        option: float(query[name])
+        for name, option in TIERED_OPTIONS.items() if name in query
+    }
+    return {
+        'default': {
+            'BACKEND': 'core.caching.backends.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': options,
+        },
+        'shared': shared,
+    }
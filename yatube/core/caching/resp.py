@@ -0,0 +1,107 @@
+"""Минимальная реализация протокола Redis (RESP2).
+
+Её хватает и клиенту кэша, и локальному серверу-заменителю: команды
+передаются массивом bulk-строк, ответы -- любым типом RESP.
+"""
+import socket
+
+
+class RespError(Exception):
+    """Ответ сервера с ошибкой (-ERR ...)."""
+
+
+class SimpleString(str):
+    """Ответ +OK: простая строка, а не bulk."""
+
+
+OK = SimpleString('OK')
+
+# incr существующего ключа одной командой: между EXISTS и INCRBY ключ
+# могли вытеснить, и INCRBY создал бы его заново со значением delta
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end"
+)
+
+
+def _bulk(value):
+    if isinstance(value, str):
+        value = value.encode()
+    elif not isinstance(value, bytes):
+        value = str(value).encode()
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def encode_command(*args):
+    return b'*%d\r\n' % len(args) + b''.join(_bulk(arg) for arg in args)
+
+
+def encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, SimpleString):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, (list, tuple)):
+        return b'*%d\r\n' % len(value) + b''.join(map(encode_reply, value))
+    return _bulk(value)
+
+
+def read_reply(stream):
+    """Читает одно значение RESP из файлоподобного потока."""
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('соединение с сервером кэша закрыто')
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b'+':
+        return SimpleString(rest.decode())
+    if prefix == b'-':
+        return RespError(rest.decode())
+    if prefix == b':':
+        return int(rest)
+    if prefix == b'$':
+        size = int(rest)
+        if size < 0:
+            return None
+        return stream.read(size + 2)[:-2]
+    if prefix == b'*':
+        size = int(rest)
+        if size < 0:
+            return None
+        return [read_reply(stream) for _ in range(size)]
+    raise RespError(f'неизвестный тип ответа {prefix!r}')
+
+
+class RespConnection:
+    """Одно TCP-соединение с конвейерной отправкой команд."""
+
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def execute_many(self, commands):
+        """Отправляет команды одним пакетом и читает все ответы.
+
+        Ошибку сервера поднимает только после чтения всех ответов, чтобы
+        соединение осталось пригодным для следующих команд.
+        """
+        self.sock.sendall(b''.join(
+            encode_command(*command) for command in commands))
+        replies = [read_reply(self.stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.execute_many([args])[0]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
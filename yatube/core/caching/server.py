@@ -0,0 +1,155 @@
+"""Локальный заменитель Redis для разработки и тестов.
+
+Держит данные в памяти процесса и понимает только команды, нужные
+RespCache. Запускается командой cache_server или прямо из тестов.
+"""
+import socketserver
+import threading
+import time
+from collections import defaultdict
+
+from .resp import (
+    INCR_EXISTING, OK, RespError, SimpleString, encode_reply, read_reply,
+)
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dbs = defaultdict(dict)
+
+    def _get(self, db, key):
+        item = self.dbs[db].get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.dbs[db][key]
+            return None
+        return value
+
+    def _expires(self, db, key):
+        return self.dbs[db][key][1]
+
+    def execute(self, db, name, args):
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return RespError(f'ERR unknown command {name!r}')
+        with self.lock:
+            try:
+                return handler(db, *args)
+            except (TypeError, ValueError):
+                return RespError(f'ERR wrong arguments for {name!r}')
+
+    def cmd_ping(self, db):
+        return SimpleString('PONG')
+
+    def cmd_get(self, db, key):
+        return self._get(db, key)
+
+    def cmd_mget(self, db, *keys):
+        return [self._get(db, key) for key in keys]
+
+    def cmd_set(self, db, key, value, *flags):
+        flags = [flag.upper() for flag in flags]
+        exists = self._get(db, key) is not None
+        if b'NX' in flags and exists or b'XX' in flags and not exists:
+            return None
+        expires = None
+        for unit, scale in ((b'EX', 1), (b'PX', 1000)):
+            if unit in flags:
+                ttl = int(flags[flags.index(unit) + 1]) / scale
+                expires = time.monotonic() + ttl
+        self.dbs[db][key] = (value, expires)
+        return OK
+
+    def cmd_del(self, db, *keys):
+        deleted = 0
+        for key in keys:
+            if self._get(db, key) is not None:
+                del self.dbs[db][key]
+                deleted += 1
+        return deleted
+
+    def cmd_exists(self, db, *keys):
+        return sum(self._get(db, key) is not None for key in keys)
+
+    def cmd_incrby(self, db, key, delta):
+        value = self._get(db, key)
+        expires = self._expires(db, key) if value is not None else None
+        try:
+            value = int(value or 0) + int(delta)
+        except ValueError:
+            return RespError('ERR value is not an integer')
+        self.dbs[db][key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_eval(self, db, script, numkeys, *args):
+        # Lua здесь нет: известен только скрипт incr из RespCache
+        if script.decode() != INCR_EXISTING or int(numkeys) != 1:
+            return RespError('ERR unknown script')
+        key, delta = args
+        if self._get(db, key) is None:
+            return None
+        return self.cmd_incrby(db, key, delta)
+
+    def cmd_pexpire(self, db, key, ttl):
+        value = self._get(db, key)
+        if value is None:
+            return 0
+        self.dbs[db][key] = (value, time.monotonic() + int(ttl) / 1000)
+        return 1
+
+    def cmd_persist(self, db, key):
+        value = self._get(db, key)
+        if value is None:
+            return 0
+        self.dbs[db][key] = (value, None)
+        return 1
+
+    def cmd_flushdb(self, db):
+        self.dbs[db].clear()
+        return OK
+
+    def cmd_dbsize(self, db):
+        return len(self.dbs[db])
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        db = 0
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if not isinstance(command, list) or not command:
+                self.wfile.write(encode_reply(RespError('ERR bad request')))
+                continue
+            name, args = command[0].decode(), command[1:]
+            if name.upper() == 'SELECT':
+                db = int(args[0])
+                reply = OK
+            else:
+                reply = self.server.store.execute(db, name, args)
+            self.wfile.write(encode_reply(reply))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 6379)):
+        super().__init__(address, RespHandler)
+        self.store = Store()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке, возвращает 'host:port'."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,63 @@
+"""Одновременное выполнение независимых частей вида.
+
+Запросы вида, которые не зависят друг от друга (страница ленты,
+счётчики автора, проверка подписки), можно отправить в базу разом и
+ждать самый долгий из них, а не их сумму. Помогает, когда база далеко
+и каждый запрос -- это в основном ожидание сети.
+
+Каждая часть выполняется в потоке пула со своим соединением, поэтому
+внутри транзакции (atomic, TestCase) части выполняются по очереди в
+текущем потоке: в другом соединении незакоммиченных данных не видно.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from .perf import instrument
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.VIEW_WORKERS,
+            thread_name_prefix='view',
+        )
+    return _executor
+
+
+def _run(func):
+    try:
+        # счётчики запроса (core.perf) приходят с контекстом, а обёртка
+        # SQL ставится на соединения каждого потока отдельно
+        with instrument.counting_queries():
+            return func()
+    finally:
+        # соединение потока пула не переживает задачу, как в запросе
+        connections.close_all()
+
+
+def _in_transaction():
+    return any(conn.in_atomic_block for conn in connections.all())
+
+
+def gather(*funcs):
+    """Результаты вызовов funcs в том же порядке.
+
+    Первая функция выполняется в текущем потоке, остальные -- в пуле
+    из VIEW_WORKERS потоков; с VIEW_WORKERS = 0 все по очереди.
+    Исключение любой из функций пробрасывается.
+    """
+    if not settings.VIEW_WORKERS or len(funcs) < 2 or _in_transaction():
+        return [func() for func in funcs]
+    # контекст (например, чтение с реплики) переходит в потоки пула
+    futures = [
+        _pool().submit(contextvars.copy_context().run, _run, func)
+        for func in funcs[1:]
+    ]
+    first = funcs[0]()
+    return [first] + [future.result() for future in futures]
@@ -0,0 +1,73 @@
+"""PostgreSQL с пулом соединений процесса (core.database.pool).
+
+ENGINE = 'core.database.backends.pool' или postgres+pool:// в
+DATABASE_URL. Закрытие соединения Django (конец запроса, close_all)
+возвращает его в пул, поэтому CONN_MAX_AGE здесь должен быть 0: иначе
+время жизни соединения вели бы и Django, и пул.
+
+Новое соединение пула открывает get_new_connection postgresql.base со
+всей его настройкой; init_connection_state и connection_created
+выполняются, как обычно, при каждой выдаче из пула.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from ... import pool
+
+
+def _is_usable(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+def _reset(connection):
+    """Откатывает незавершённую транзакцию перед возвратом в пул."""
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+def _create(wrapper, conn_params):
+    settings_dict = wrapper.settings_dict
+    connect = super(DatabaseWrapper, wrapper).get_new_connection
+    return pool.ConnectionPool(
+        lambda: connect(conn_params),
+        size=settings_dict.get('POOL_SIZE', 10),
+        timeout=settings_dict.get('POOL_TIMEOUT', 5.0),
+        check_interval=settings_dict.get('POOL_CHECK_INTERVAL', 30.0),
+        is_usable=_is_usable,
+        reset=_reset,
+    )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'core.database.backends.pool требует CONN_MAX_AGE = 0')
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def get_new_connection(self, conn_params):
+        connection = pool.get(
+            self.alias, lambda: _create(self, conn_params)).acquire()
+        # уровень изоляции соединению выставлен при открытии, а этой
+        # обёртке его нужно знать, как в postgresql.base
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            pool.get(self.alias).release(self.connection)
@@ -0,0 +1,17 @@
+"""SQLite, где atomic() открывает транзакцию через BEGIN IMMEDIATE.
+
+Обычный BEGIN откладывает блокировку на запись до первого INSERT или
+UPDATE. Если до него в транзакции было чтение, а другой процесс успел
+записать, SQLite отвечает "database is locked" сразу, не дожидаясь
+busy_timeout. BEGIN IMMEDIATE берёт блокировку в начале, и тогда
+писатели честно ждут друг друга.
+
+ENGINE = 'core.database.backends.sqlite' или transaction_mode=immediate
+в DATABASE_URL.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
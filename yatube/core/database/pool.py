@@ -0,0 +1,117 @@
+"""Пул соединений с базой на процесс.
+
+Соединения Django привязаны к потоку и с CONN_MAX_AGE = 0 открываются
+заново на каждый запрос; с CONN_MAX_AGE > 0 каждый поток держит своё,
+и при многих потоках (ASGI_THREADS, VIEW_WORKERS) база видит их все.
+Пул держит не больше size соединений на процесс: поток берёт
+соединение в начале работы с базой и возвращает его в конце запроса.
+
+Пул не знает о драйвере: connect открывает соединение, is_usable и
+reset проверяют и чистят его перед повторным использованием.
+"""
+import threading
+import time
+from collections import deque
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=10, timeout=5.0, check_interval=30.0,
+                 is_usable=None, reset=None):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.is_usable = is_usable or (lambda connection: True)
+        self.reset = reset or (lambda connection: True)
+        # (соединение, когда вернули); берём последнее -- оно теплее
+        self.idle = deque()
+        self.opened = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while True:
+                if self.idle:
+                    connection, returned = self.idle.pop()
+                    break
+                if self.opened < self.size:
+                    self.opened += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'Нет свободного соединения за {self.timeout} с '
+                        f'(в пуле {self.size})')
+                self.condition.wait(remaining)
+        if connection is not None:
+            idle_for = time.monotonic() - returned
+            if idle_for < self.check_interval or self.is_usable(connection):
+                return connection
+            self._close(connection)
+        try:
+            return self.connect()
+        except BaseException:
+            self._forget()
+            raise
+
+    def release(self, connection):
+        """Возвращает соединение; сломанное или грязное закрывается."""
+        try:
+            usable = self.reset(connection)
+        except Exception:
+            usable = False
+        if not usable:
+            self._close(connection)
+            self._forget()
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        self._close(connection)
+        self._forget()
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+            self.opened -= len(idle)
+            self.condition.notify_all()
+        for connection, returned in idle:
+            self._close(connection)
+
+    def _forget(self):
+        with self.condition:
+            self.opened -= 1
+            self.condition.notify()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'opened': self.opened,
+                'idle': len(self.idle),
+            }
+
+
+def get(alias, create=None):
+    """Пул базы alias; create() строит его при первом обращении."""
+    with _lock:
+        if alias not in _pools and create is not None:
+            _pools[alias] = create()
+        return _pools.get(alias)
@@ -0,0 +1,114 @@
+"""Чтение лент с реплик, запись -- в основную базу.
+
+Реплики -- алиасы из DATABASE_REPLICAS. С них читают только виды под
+replica_reads и только запросы GET и HEAD; всё остальное, включая
+сессии и пользователя в middleware, идёт в default. Реплика на время
+вида выбирается одна, чтобы страница не собиралась из разных копий.
+
+Read-your-writes: после небезопасного запроса (POST, PUT, PATCH,
+DELETE) или записи контента, отмеченной content_written, middleware
+ставит cookie REPLICA_PIN_COOKIE на REPLICA_LAG секунд, и пока она
+жива, этот браузер читает из default и видит свои изменения. Служебные
+записи в GET (сессия, очередь задач) не прикрепляют.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_reads = ContextVar('replica_reads', default=None)
+# список, а не флаг: копия контекста в потоке gather меняет тот же список
+_writes = ContextVar('replica_writes', default=None)
+
+
+class ReplicaReads:
+    """Чтение текущего вида с реплики alias.
+
+    lagging отмечает, что страница зависит от изменений моложе
+    REPLICA_LAG: реплика может их ещё не видеть (см. feed_cache).
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.lagging = False
+
+
+def current():
+    """ReplicaReads текущего вида или None, если чтение идёт из default."""
+    return _reads.get()
+
+
+def content_written():
+    """Отмечает, что текущий запрос записал контент."""
+    writes = _writes.get()
+    if writes is not None:
+        writes.append(True)
+
+
+def pinned(request):
+    try:
+        until = float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+def replica_reads(view):
+    """Вид читает с реплики, если запрос безопасный и не прикреплён."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.DATABASE_REPLICAS
+                or request.method not in ('GET', 'HEAD')
+                or pinned(request)):
+            return view(request, *args, **kwargs)
+        user = getattr(request, 'user', None)
+        if user is not None:
+            # сессия и пользователь -- из default, до переключения
+            user.is_authenticated
+        token = _reads.set(
+            ReplicaReads(random.choice(settings.DATABASE_REPLICAS)))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = _reads.get()
+        return reads.alias if reads is not None else None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики -- копии default, объекты из них можно связывать
+        return True
+
+
+class ReplicaPinMiddleware:
+    """Ставит cookie прикрепления к default после записи контента."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = []
+        token = _writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            _writes.reset(token)
+        wrote = writes or request.method not in SAFE_METHODS
+        if wrote and settings.DATABASE_REPLICAS:
+            lag = settings.REPLICA_LAG
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, str(time.time() + lag),
+                max_age=lag, httponly=True, samesite='Lax')
+        return response
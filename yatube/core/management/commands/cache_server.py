@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.caching.server import RespServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальный заменитель Redis для общего кэша: '
+        'CACHE_URL=resp://127.0.0.1:6379/0'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+
+    def handle(self, *args, **options):
+        server = RespServer((options['host'], options['port']))
+        self.stdout.write(
+            f'Сервер кэша слушает {options["host"]}:{options["port"]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,53 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.perf import stats
+
+COLUMNS = (
+    ('wall_ms', 'p50'), ('wall_ms', 'p95'), ('wall_ms', 'p99'),
+    ('db_queries', 'avg'), ('db_ms', 'avg'), ('template_ms', 'avg'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка PerfStatsMiddleware по видам из дампов всех процессов '
+        'в PERF_STATS_DIR'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=settings.PERF_STATS_DIR,
+            help='каталог дампов (по умолчанию PERF_STATS_DIR)')
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument(
+            '--reset', action='store_true', help='удалить дампы после вывода')
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if not directory or not os.path.isdir(directory):
+            raise CommandError(
+                'Нет каталога дампов: задайте PERF_STATS_DIR или --dir')
+        summary = stats.summarize(stats.load(directory))
+        if options['json']:
+            self.stdout.write(json.dumps(summary, ensure_ascii=False))
+        else:
+            self.write_table(summary)
+        if options['reset']:
+            for name in os.listdir(directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(directory, name))
+
+    def write_table(self, summary):
+        header = ['вид', 'запросов'] + [
+            f'{metric} {stat}' for metric, stat in COLUMNS] + ['кэш, %']
+        self.stdout.write(' | '.join(header))
+        for view, row in summary.items():
+            ratio = row['cache_hit_ratio']
+            cells = [view, str(row['requests'])]
+            cells += [f'{row[metric][stat]:.1f}' for metric, stat in COLUMNS]
+            cells.append('-' if ratio is None else f'{ratio * 100:.0f}')
+            self.stdout.write(' | '.join(cells))
@@ -0,0 +1,126 @@
+"""Счётчики запроса: SQL, рендеринг шаблонов и обращения к кэшу.
+
+Счётчики текущего запроса лежат в ContextVar; вне PerfStatsMiddleware
+обёртки сразу передают вызов дальше. Части вида в потоках
+core.concurrency.gather пишут в те же счётчики. Обёртки кэша считают только
+внешний вызов: TieredCache внутри обращается к своим уровням, и это не
+должно давать лишних попаданий.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+current = ContextVar('perf_sample', default=None)
+_MISSING = object()
+_installed = False
+# счётчики SQL обновляют и потоки gather
+_lock = threading.Lock()
+
+
+def new_sample():
+    return {
+        'wall_ms': 0.0,
+        'db_ms': 0.0,
+        'db_queries': 0,
+        'template_ms': 0.0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        '_cache_depth': 0,
+    }
+
+
+def _count_query(execute, sql, params, many, context):
+    sample = current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if sample is not None:
+            elapsed = (time.perf_counter() - started) * 1000
+            with _lock:
+                sample['db_queries'] += 1
+                sample['db_ms'] += elapsed
+
+
+@contextmanager
+def counting_queries():
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_count_query))
+        yield
+
+
+def _wrap_render(render):
+    @wraps(render)
+    def timed_render(self, *args, **kwargs):
+        sample = current.get()
+        if sample is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            sample['template_ms'] += (time.perf_counter() - started) * 1000
+    return timed_render
+
+
+@contextmanager
+def _outer_cache_call(sample):
+    sample['_cache_depth'] += 1
+    try:
+        yield sample['_cache_depth'] == 1
+    finally:
+        sample['_cache_depth'] -= 1
+
+
+def _wrap_get(get):
+    @wraps(get)
+    def counted_get(self, key, default=None, version=None):
+        sample = current.get()
+        if sample is None:
+            return get(self, key, default, version)
+        with _outer_cache_call(sample) as outer:
+            value = get(self, key, _MISSING, version)
+        if outer:
+            sample['cache_misses' if value is _MISSING else 'cache_hits'] += 1
+        return default if value is _MISSING else value
+    return counted_get
+
+
+def _wrap_get_many(get_many):
+    @wraps(get_many)
+    def counted_get_many(self, keys, version=None):
+        sample = current.get()
+        if sample is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        with _outer_cache_call(sample) as outer:
+            found = get_many(self, keys, version)
+        if outer:
+            sample['cache_hits'] += len(found)
+            sample['cache_misses'] += len(keys) - len(found)
+        return found
+    return counted_get_many
+
+
+def install():
+    """Оборачивает Template.render и get/get_many настроенных кэшей."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _wrap_render(Template.render)
+    backends = {
+        import_string(config['BACKEND'])
+        for config in settings.CACHES.values()
+    }
+    for backend in backends:
+        backend.get = _wrap_get(backend.get)
+        backend.get_many = _wrap_get_many(backend.get_many)
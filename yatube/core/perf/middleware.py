@@ -0,0 +1,30 @@
+import time
+
+from . import instrument, stats
+
+
+class PerfStatsMiddleware:
+    """Копит по каждому виду время ответа, SQL, шаблоны и кэш.
+
+    Стоит первым в MIDDLEWARE, чтобы время включало остальные
+    middleware. Для потоковых ответов учитывается время до первого
+    байта, а не до конца передачи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument.install()
+
+    def __call__(self, request):
+        sample = instrument.new_sample()
+        token = instrument.current.set(sample)
+        started = time.perf_counter()
+        try:
+            with instrument.counting_queries():
+                response = self.get_response(request)
+        finally:
+            instrument.current.reset(token)
+        sample['wall_ms'] = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        stats.record(match.view_name if match else '<unresolved>', sample)
+        return response
@@ -0,0 +1,184 @@
+"""Гистограммы времени запросов по видам, общие для процесса.
+
+Каждый процесс копит свои гистограммы и, если задан PERF_STATS_DIR,
+раз в PERF_STATS_DUMP_INTERVAL секунд сбрасывает их в <dir>/<pid>.json.
+Команда perf_stats складывает файлы всех процессов.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# верхние границы корзин; последняя корзина -- всё, что больше
+BOUNDS = (
+    0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+METRICS = ('wall_ms', 'db_ms', 'db_queries', 'template_ms')
+
+
+class Histogram:
+    def __init__(self, counts=None, total=0.0, peak=0.0):
+        self.counts = counts or [0] * (len(BOUNDS) + 1)
+        self.total = total
+        self.peak = peak
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        self.counts[bisect_left(BOUNDS, value)] += 1
+        self.total += value
+        self.peak = max(self.peak, value)
+
+    def percentile(self, q):
+        """Оценка сверху: граница корзины, в которую попал q-й процентиль."""
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(BOUNDS + (self.peak,), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.peak)
+        return 0.0
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.peak = max(self.peak, other.peak)
+
+    def as_dict(self):
+        return {'counts': self.counts, 'total': self.total, 'peak': self.peak}
+
+
+class ViewStats:
+    def __init__(self):
+        self.histograms = {metric: Histogram() for metric in METRICS}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def requests(self):
+        return self.histograms['wall_ms'].count
+
+    def add(self, sample):
+        for metric in METRICS:
+            self.histograms[metric].add(sample[metric])
+        self.cache_hits += sample['cache_hits']
+        self.cache_misses += sample['cache_misses']
+
+    def merge(self, other):
+        for metric in METRICS:
+            self.histograms[metric].merge(other.histograms[metric])
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    def summary(self):
+        requests = self.requests
+        result = {'requests': requests}
+        for metric, histogram in self.histograms.items():
+            result[metric] = {
+                'avg': histogram.total / requests if requests else 0.0,
+                'p50': histogram.percentile(50),
+                'p95': histogram.percentile(95),
+                'p99': histogram.percentile(99),
+                'max': histogram.peak,
+            }
+        lookups = self.cache_hits + self.cache_misses
+        result['cache_hits'] = self.cache_hits
+        result['cache_misses'] = self.cache_misses
+        result['cache_hit_ratio'] = (
+            self.cache_hits / lookups if lookups else None)
+        return result
+
+    def as_dict(self):
+        return {
+            'histograms': {
+                metric: histogram.as_dict()
+                for metric, histogram in self.histograms.items()
+            },
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for metric, histogram in data['histograms'].items():
+            stats.histograms[metric] = Histogram(**histogram)
+        stats.cache_hits = data['cache_hits']
+        stats.cache_misses = data['cache_misses']
+        return stats
+
+
+_views = {}
+_lock = threading.Lock()
+_last_dump = time.monotonic()
+
+
+def record(view, sample):
+    with _lock:
+        _views.setdefault(view, ViewStats()).add(sample)
+    maybe_dump()
+
+
+def snapshot():
+    """Копия статистики процесса: {вид: ViewStats}."""
+    with _lock:
+        return {
+            view: ViewStats.from_dict(stats.as_dict())
+            for view, stats in _views.items()
+        }
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def summarize(views):
+    return {
+        view: views[view].summary()
+        for view in sorted(views, key=lambda v: -views[v].requests)
+    }
+
+
+def dump_path(directory, pid=None):
+    return os.path.join(directory, f'{pid or os.getpid()}.json')
+
+
+def dump(directory):
+    os.makedirs(directory, exist_ok=True)
+    path = dump_path(directory)
+    data = {view: stats.as_dict() for view, stats in snapshot().items()}
+    # пишем во временный файл и подменяем, чтобы читатель не увидел половину
+    with open(f'{path}.tmp', 'w') as dump_file:
+        json.dump(data, dump_file)
+    os.replace(f'{path}.tmp', path)
+
+
+def maybe_dump():
+    global _last_dump
+    directory = settings.PERF_STATS_DIR
+    if not directory:
+        return
+    now = time.monotonic()
+    if now - _last_dump < settings.PERF_STATS_DUMP_INTERVAL:
+        return
+    _last_dump = now
+    dump(directory)
+
+
+def load(directory):
+    """Складывает статистику всех процессов из каталога дампов."""
+    merged = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name)) as dump_file:
+            data = json.load(dump_file)
+        for view, raw in data.items():
+            merged.setdefault(view, ViewStats()).merge(
+                ViewStats.from_dict(raw))
+    return merged
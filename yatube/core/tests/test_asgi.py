@@ -0,0 +1,138 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+from .. import concurrency
+from ..asgi import WSGIToASGI
+
+User = get_user_model()
+
+
+def call(application, path, method='GET', body=b'', headers=()):
+    """Ответ ASGI-приложения: (статус, заголовки, тело, число сообщений)."""
+    messages = []
+    chunks = [body[:3], body[3:]]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {
+            'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+    async def send(message):
+        messages.append(message)
+
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')] + list(headers),
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+    asyncio.run(application(scope, receive, send))
+    start = messages[0]
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), content, len(messages)
+
+
+def echo(environ, start_response):
+    start_response('201 Created', [('X-Path', environ['PATH_INFO'])])
+    body = environ['wsgi.input'].read()
+    return [environ['REQUEST_METHOD'].encode(), b' ', body]
+
+
+class WSGIToASGITest(SimpleTestCase):
+    def test_request_and_response(self):
+        """Метод, путь и тело доходят до WSGI, ответ -- до сервера"""
+        application = WSGIToASGI(echo, workers=2)
+        self.addCleanup(application.executor.shutdown)
+        status, headers, content, messages = call(
+            application, '/путь/', method='POST', body=b'abcdef')
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'x-path'].decode(), '/путь/')
+        self.assertEqual(content, b'POST abcdef')
+        # список без атрибута streaming отдаётся кусками
+        self.assertEqual(messages, 5)
+
+    def test_lifespan(self):
+        application = WSGIToASGI(echo, workers=1)
+        sent = []
+        incoming = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+class DjangoASGITest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.application = WSGIToASGI(WSGIHandler(), workers=2)
+        self.addCleanup(self.application.executor.shutdown)
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Пост через ASGI')
+
+    def test_index(self):
+        """Обычный ответ Django уходит одним сообщением с телом"""
+        status, headers, content, messages = call(
+            self.application, reverse('posts:index'))
+        self.assertEqual(status, 200)
+        self.assertIn('Пост через ASGI', content.decode())
+        self.assertEqual(messages, 2)
+
+    def test_not_found(self):
+        status, headers, content, messages = call(
+            self.application, '/nowhere/')
+        self.assertEqual(status, 404)
+
+
+class GatherTest(TestCase):
+    def test_inline_in_transaction(self):
+        """В транзакции части выполняются по очереди в этом же потоке"""
+        with override_settings(VIEW_WORKERS=2):
+            self.assertEqual(
+                concurrency.gather(lambda: 1, lambda: 2, lambda: 3),
+                [1, 2, 3])
+
+
+class ConcurrentProfileTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост автора')
+
+    @override_settings(VIEW_WORKERS=2, ANONYMOUS_PAGE_CACHE=False)
+    def test_profile(self):
+        """С VIEW_WORKERS профиль собирается из запросов в пуле"""
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['author_stats'].posts_count, 1)
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Пост автора'])
+
+    @override_settings(VIEW_WORKERS=2)
+    def test_error_is_raised(self):
+        def fail():
+            raise ValueError('ошибка')
+
+        with self.assertRaises(ValueError):
+            concurrency.gather(lambda: 1, fail)
@@ -0,0 +1,140 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..caching.backends import RespCache, TieredCache
+from ..caching.config import cache_config
+from ..caching.server import RespServer
+
+
+class RespServerTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RespServer(('127.0.0.1', 0))
+        cls.location = cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.store.dbs.clear()
+
+
+class RespCacheTest(RespServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RespCache(self.location, {})
+        self.addCleanup(self.cache.disconnect)
+
+    def test_set_get_delete(self):
+        """Значения любых типов сохраняются, читаются и удаляются"""
+        self.cache.set('key', {'posts': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'posts': [1, 2]})
+        self.cache.delete('key')
+        self.assertEqual(self.cache.get('key', 'нет'), 'нет')
+
+    def test_add_incr_and_many(self):
+        """add не перезаписывает, incr атомарен на сервере"""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        # проверка и увеличение -- одна команда, ключ не создаётся
+        self.assertFalse(self.cache.has_key('missing'))
+        self.cache.set_many({'a': 'x', 'b': None})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 'x', 'b': None})
+
+    def test_timeout(self):
+        """Нулевой таймаут не сохраняет значение"""
+        self.cache.set('key', 'value', 0)
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_reconnects_after_server_restart(self):
+        """Разорванное соединение переоткрывается"""
+        self.cache.set('key', 'value')
+        self.cache._connection.sock.close()
+        self.assertEqual(self.cache.get('key'), 'value')
+
+
+class TieredCacheTest(RespServerTestCase):
+    def setUp(self):
+        super().setUp()
+        settings = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'core.caching.backends.RespCache',
+                'LOCATION': self.location,
+            },
+        }
+        override = override_settings(CACHES=settings)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(lambda: caches['shared'].disconnect())
+        # два «процесса» с разными L1 над одним общим кэшем
+        self.first, self.second = (
+            TieredCache('shared', {'OPTIONS': {
+                'LOCAL_NAME': f'test-{name}', 'SYNC_INTERVAL': 60,
+            }})
+            for name in ('first', 'second')
+        )
+        self.first.clear()
+        self.second.clear()
+
+    def test_reads_are_served_from_local_tier(self):
+        """Повторное чтение не ходит в общий кэш"""
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        caches['shared'].set(self.second.make_key('key'), 'в обход')
+        self.assertEqual(self.second.get('key'), 'value')
+
+    def test_writes_invalidate_other_processes(self):
+        """Запись одного процесса вытесняет ключ из L1 другого"""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.first.delete('other')
+        self.second.sync(force=True)
+        self.assertEqual(self.second.get('key'), 'new')
+
+    def test_clear_resets_other_processes(self):
+        """clear() сбрасывает L1 всех процессов"""
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.first.clear()
+        self.second.sync(force=True)
+        self.assertIsNone(self.second.get('key'))
+
+    def test_add_and_incr(self):
+        """add и incr идут через общий кэш"""
+        self.assertTrue(self.first.add('generation', 1))
+        self.assertFalse(self.second.add('generation', 2))
+        self.assertEqual(self.second.incr('generation'), 2)
+        self.first.sync(force=True)
+        self.assertEqual(self.first.get('generation'), 2)
+
+
+class CacheConfigTest(SimpleTestCase):
+    def test_default_is_locmem(self):
+        """Без CACHE_URL остаётся кэш процесса"""
+        self.assertEqual(
+            cache_config(None)['default']['BACKEND'],
+            'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_resp_url(self):
+        """resp:// даёт двухуровневый кэш поверх RespCache"""
+        config = cache_config('resp://cache:6380/2?sync_interval=0.25')
+        self.assertEqual(
+            config['default']['BACKEND'], 'core.caching.backends.TieredCache')
+        self.assertEqual(config['default']['OPTIONS'], {'SYNC_INTERVAL': 0.25})
+        self.assertEqual(config['shared']['LOCATION'], 'cache:6380')
+        self.assertEqual(config['shared']['OPTIONS'], {'DB': 2})
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            cache_config('memcached://127.0.0.1')
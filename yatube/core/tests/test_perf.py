@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..perf import stats
+from ..perf.stats import Histogram
+
+User = get_user_model()
+
+
+class HistogramTest(SimpleTestCase):
+    def test_percentiles(self):
+        """Процентили оцениваются границей корзины"""
+        histogram = Histogram()
+        for value in [1] * 90 + [40] * 9 + [300]:
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(95), 50)
+        self.assertEqual(histogram.percentile(100), 300)
+
+
+class PerfStatsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_index_is_recorded(self):
+        """Время, запросы к базе, шаблоны и кэш считаются по виду"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        row = stats.summarize(stats.snapshot())['posts:index']
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['db_queries']['max'], 0)
+        self.assertGreater(row['template_ms']['max'], 0)
+        self.assertGreater(row['cache_misses'], 0)
+        self.assertGreater(row['cache_hits'], 0)
+
+    def test_endpoint_is_staff_only(self):
+        """Статистика доступна только персоналу"""
+        response = self.client.get(reverse('perf_stats'))
+        self.assertEqual(response.status_code, 302)
+        self.staff_client.get(reverse('posts:index'))
+        response = self.staff_client.get(reverse('perf_stats'))
+        self.assertIn('posts:index', response.json())
+
+    def test_dump_and_command(self):
+        """Дампы процессов складываются командой perf_stats"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(
+                PERF_STATS_DIR=directory, PERF_STATS_DUMP_INTERVAL=0):
+            self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('perf_stats', dir=directory, stdout=out)
+        self.assertIn('posts:index | 1 |', out.getvalue())
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE=False)
+class PoolQueriesTest(TransactionTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        # у читателя проверка подписки -- запрос в потоке пула
+        self.client.force_login(
+            User.objects.create_user(username='reader'))
+        self.url = reverse('posts:profile', args=[author.username])
+
+    def queries(self):
+        cache.clear()
+        stats.reset()
+        self.client.get(self.url)
+        row = stats.summarize(stats.snapshot())['posts:profile']
+        return row['db_queries']['max']
+
+    def test_pool_queries_are_counted(self):
+        """Запросы частей вида в потоках пула тоже считаются"""
+        inline = self.queries()
+        with override_settings(VIEW_WORKERS=2):
+            self.assertEqual(self.queries(), inline)
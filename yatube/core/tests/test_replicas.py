@@ -0,0 +1,176 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+from posts import tasks
+from posts.models import Post, User
+
+from .. import concurrency
+from ..database import routers
+from ..database.config import replica_config
+from ..database.routers import (
+    ReplicaPinMiddleware, ReplicaRouter, replica_reads,
+)
+
+# отдельная база из yatube.settings_test: данные в ней свои, не default
+REPLICAS = ['replica']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTest(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Пост')
+        # реплика отстаёт: в ней только старый пост
+        replica_author = User.objects.db_manager('replica').create_user(
+            username='author')
+        Post.objects.using('replica').create(
+            author=replica_author, text='Пост с реплики')
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.authorized_client = self.client_class()
+        self.authorized_client.force_login(self.user)
+
+    def post_reads(self, client, url):
+        """Ответ и алиасы, которые роутер выбрал для чтения постов."""
+        aliases = []
+        read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = read(router, model, **hints)
+            if model is Post:
+                aliases.append(alias)
+            return alias
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = client.get(url)
+        return response, aliases
+
+    def test_anonymous_feed_reads_replica(self):
+        response, aliases = self.post_reads(
+            self.client, reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(aliases)
+        self.assertEqual(set(aliases), {'replica'})
+        self.assertContains(response, 'Пост с реплики')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_write_pins_to_primary(self):
+        """После записи браузер читает из default и видит свой пост"""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'})
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(
+            response.cookies[settings.REPLICA_PIN_COOKIE]['max-age'],
+            settings.REPLICA_LAG)
+        response, aliases = self.post_reads(
+            self.authorized_client,
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertEqual(set(aliases), {None})
+        self.assertContains(response, 'Свежий пост')
+        # без cookie тот же пользователь читает реплику, где поста ещё нет
+        self.authorized_client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+        cache.clear()
+        response, aliases = self.post_reads(
+            self.authorized_client, reverse('posts:index'))
+        self.assertEqual(set(aliases), {'replica'})
+        self.assertContains(response, 'Пост с реплики')
+        self.assertNotContains(response, 'Свежий пост')
+
+    def test_service_writes_do_not_pin(self):
+        """Сессия и очередь задач в GET не прикрепляют к default"""
+        def view(request):
+            request.session['seen'] = True
+            request.session.save()
+            queue.enqueue(tasks.bump_followers, self.author.pk)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        with override_settings(JOBS_EAGER=False):
+            response = ReplicaPinMiddleware(view)(request)
+        self.assertTrue(Job.objects.exists())
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_get_with_write_pins(self):
+        response = self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_expired_pin(self):
+        self.client.cookies[settings.REPLICA_PIN_COOKIE] = '1'
+        _, aliases = self.post_reads(self.client, reverse('posts:index'))
+        self.assertEqual(set(aliases), {'replica'})
+
+    def test_fresh_feed_is_not_validated(self):
+        """Поколение моложе REPLICA_LAG: без ETag и с коротким max-age"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn(
+            f'max-age={settings.REPLICA_LAG}', response['Cache-Control'])
+        with override_settings(REPLICA_LAG=0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('ETag'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        response, aliases = self.post_reads(
+            self.authorized_client, reverse('posts:index'))
+        self.assertEqual(set(aliases), {None})
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class ReplicaReadsTest(SimpleTestCase):
+    def test_unsafe_method_reads_primary(self):
+        view = replica_reads(lambda request: routers.current())
+        with override_settings(DATABASE_REPLICAS=REPLICAS):
+            self.assertIsNone(view(RequestFactory().post('/')))
+            self.assertEqual(view(RequestFactory().get('/')).alias, 'replica')
+        self.assertIsNone(routers.current())
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, VIEW_WORKERS=2)
+    def test_gather_keeps_replica(self):
+        """Части вида в потоках пула читают с той же реплики"""
+        def view(request):
+            return concurrency.gather(routers.current, routers.current)
+
+        view = replica_reads(view)
+        first, second = view(RequestFactory().get('/'))
+        self.assertIs(first, second)
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, VIEW_WORKERS=2)
+    def test_pin_from_gather_thread(self):
+        """Запись контента в потоке пула тоже прикрепляет"""
+        def view(request):
+            concurrency.gather(lambda: None, routers.content_written)
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_unsafe_method_pins(self):
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(
+            RequestFactory().post('/'))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_replica_config(self):
+        replicas = replica_config('sqlite:///a.sqlite3, sqlite:///b.sqlite3')
+        self.assertEqual(list(replicas), ['replica1', 'replica2'])
+        self.assertEqual(replicas['replica2']['NAME'], '/b.sqlite3')
+        self.assertEqual(replicas['replica1']['TEST'], {'MIRROR': 'default'})
+        self.assertEqual(replica_config(None), {})
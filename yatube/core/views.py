@@ -1,4 +1,15 @@
+import time
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.db import connections
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from .database import pool
+from .perf import stats
 
 
 def page_not_found(request, exception):
@@ -15,3 +26,60 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def perf_stats(request):
+    """Статистика видов: этого процесса или, с ?all, всех из дампов."""
+    if 'all' in request.GET and settings.PERF_STATS_DIR:
+        stats.dump(settings.PERF_STATS_DIR)
+        views = stats.load(settings.PERF_STATS_DIR)
+    else:
+        views = stats.snapshot()
+    return JsonResponse(
+        stats.summarize(views), json_dumps_params={'ensure_ascii': False})
+
+
+def _check(probe):
+    started = time.perf_counter()
+    try:
+        probe()
+    except Exception as error:
+        return {'ok': False, 'error': str(error)}
+    return {'ok': True, 'ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _select_one(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def _cache_round_trip(alias):
+    # недоступный сервер кэша поднимает исключение; DummyCache ничего
+    # не хранит, и это не ошибка
+    caches[alias].set('health:ping', 1, 10)
+    caches[alias].get('health:ping')
+
+
+@never_cache
+def health(request):
+    """Доступность баз и кэша для балансировщика: 200 или 503."""
+    checks = {
+        f'database:{alias}': _check(lambda alias=alias: _select_one(alias))
+        for alias in connections
+    }
+    checks.update({
+        f'cache:{alias}': _check(lambda alias=alias: _cache_round_trip(alias))
+        for alias in settings.CACHES
+    })
+    for alias in connections:
+        alias_pool = pool.get(alias)
+        if alias_pool is not None:
+            checks[f'database:{alias}']['pool'] = alias_pool.stats()
+    healthy = all(check['ok'] for check in checks.values())
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'error', 'checks': checks},
+        status=200 if healthy else 503,
+        json_dumps_params={'ensure_ascii': False},
+    )
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'key', 'status', 'attempts', 'run_at')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = ('created', 'error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            locked_until=None)
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
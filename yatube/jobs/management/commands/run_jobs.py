@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди задач: выполняет задачи из таблицы jobs_job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='выполнить всё, что готово, и выйти')
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1,
+            help='пауза, когда очередь пуста, с')
+
+    def handle(self, *args, **options):
+        total_done = total_failed = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                close_old_connections()
+                done, failed = queue.work(options['batch'])
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            f'Задач выполнено: {total_done}, упало: {total_failed}, '
+            f'за {time.perf_counter() - started:.1f} с')
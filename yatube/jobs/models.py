@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (jobs.queue).
+
+    Выполненные задачи удаляются; в таблице остаются ждущие,
+    выполняемые и упавшие после всех попыток.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (FAILED, 'упала'),
+    )
+
+    name = models.CharField('задача', max_length=100)
+    args = models.TextField('аргументы', default='[]')
+    key = models.CharField(
+        'ключ',
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='вторая задача с тем же ключом не ставится'
+    )
+    status = models.CharField(
+        'статус', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'попыток всего', default=1)
+    run_at = models.DateTimeField('выполнить после', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'занята воркером до', null=True, blank=True)
+    error = models.TextField('последняя ошибка', blank=True)
+    created = models.DateTimeField('поставлена', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
@@ -0,0 +1,139 @@
+"""Очередь фоновых задач в таблице базы.
+
+Задача ставится в той же транзакции, что и запись, которая её
+породила: она появится, только если запись закоммичена. Воркер
+(manage.py run_jobs) забирает задачи условным UPDATE, поэтому
+несколько воркеров не выполнят одну задачу одновременно, а
+SELECT ... FOR UPDATE SKIP LOCKED, которого нет в SQLite, не нужен.
+
+Упавшая задача повторяется с растущей паузой JOB_RETRY_DELAY * 2^n, а
+после max_attempts попыток остаётся со статусом failed. Задача,
+которую воркер не закончил за JOB_TIMEOUT (например, он упал), снова
+становится доступна. Поэтому задачи должны быть идемпотентными.
+
+Ключ делает постановку идемпотентной: пока в таблице есть задача с тем
+же ключом, вторая не ставится.
+
+С JOBS_EAGER задача выполняется в текущем потоке после коммита
+транзакции, которая её поставила (вне транзакции -- сразу): как и из
+очереди, она видит закоммиченную запись и не выполняется при откате.
+Так работают тесты и разработка без воркера.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name, attempts=None):
+    """Регистрирует функцию как задачу name; её аргументы -- JSON.
+
+    attempts -- сколько раз пробовать; по умолчанию JOB_ATTEMPTS.
+    """
+    def register(func):
+        func.job_name = name
+        func.job_attempts = attempts
+        _tasks[name] = func
+        return func
+    return register
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """Ставит func(*args) в очередь; с JOBS_EAGER выполняет после коммита."""
+    # аргументы проверяются и в eager-режиме: в очереди они станут JSON
+    payload = json.dumps(args)
+    if settings.JOBS_EAGER:
+        args = json.loads(payload)
+        transaction.on_commit(lambda: _run_eager(func, args))
+        return
+    Job.objects.bulk_create([Job(
+        name=func.job_name,
+        args=payload,
+        key=key,
+        max_attempts=func.job_attempts or settings.JOB_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def _run_eager(func, args):
+    # как и в воркере, упавшая задача не откатывает запись запроса
+    try:
+        with transaction.atomic():
+            func(*args)
+    except Exception:
+        logger.exception('Задача %s упала', func.job_name)
+
+
+def _due(now):
+    return (
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(limit):
+    """Забирает до limit готовых задач; каждую получает один воркер."""
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.JOB_TIMEOUT)
+    candidates = Job.objects.filter(_due(now)).order_by(
+        'run_at', 'pk').values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if Job.objects.filter(_due(now), pk=pk).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=locked_until,
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def run(job):
+    """Выполняет забранную задачу; True, если она прошла.
+
+    Итог записывается, только если задачу за это время не забрал
+    другой воркер (по locked_until, выставленному в claim).
+    """
+    mine = Job.objects.filter(pk=job.pk, locked_until=job.locked_until)
+    try:
+        func = _tasks.get(job.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        with transaction.atomic():
+            func(*json.loads(job.args))
+    except Exception:
+        logger.warning('Задача %s упала', job, exc_info=True)
+        failure = {'error': traceback.format_exc(), 'locked_until': None}
+        if job.attempts >= job.max_attempts:
+            mine.update(status=Job.FAILED, **failure)
+        else:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            mine.update(
+                status=Job.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                **failure)
+        return False
+    mine.delete()
+    return True
+
+
+def work(limit=100):
+    """Одна пачка задач; возвращает число выполненных и упавших."""
+    done = failed = 0
+    for job in claim(limit):
+        if run(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import queue
+from ..models import Job
+
+calls = []
+
+
+@queue.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task('tests.fail', attempts=2)
+def fail():
+    Job.objects.create(name='tests.never_committed')
+    raise RuntimeError('не вышло')
+
+
+@override_settings(JOBS_EAGER=False, JOB_RETRY_DELAY=60)
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_work(self):
+        """Задача ждёт воркера, выполняется и удаляется"""
+        queue.enqueue(record, 'значение')
+        self.assertEqual(calls, [])
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.name, job.status, job.max_attempts),
+            ('tests.record', Job.QUEUED, 5))
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(calls, ['значение'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_key_is_idempotent(self):
+        """Пока задача с ключом в очереди, вторая не ставится"""
+        queue.enqueue(record, 1, key='record:1')
+        queue.enqueue(record, 2, key='record:1')
+        queue.enqueue(record, 3, key='record:3')
+        queue.work()
+        self.assertEqual(sorted(calls), [1, 3])
+        queue.enqueue(record, 4, key='record:1')
+        self.assertTrue(Job.objects.filter(key='record:1').exists())
+
+    def test_delayed_job(self):
+        queue.enqueue(record, 1, delay=60)
+        self.assertEqual(queue.work(), (0, 0))
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(queue.work(), (1, 0))
+
+    def test_retries_then_fails(self):
+        """Упавшая задача откатывается, повторяется позже и сдаётся"""
+        queue.enqueue(fail)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(queue.work(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('не вышло', job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(queue.work(), (0, 0))
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(queue.work(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(queue.work(), (0, 0))
+
+    def test_unknown_task(self):
+        Job.objects.create(name='tests.missing', max_attempts=1)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(queue.work(), (0, 1))
+        self.assertIn('tests.missing', Job.objects.get().error)
+
+    def test_claim_is_exclusive(self):
+        """Забранную задачу не получит второй воркер, пока не истечёт"""
+        queue.enqueue(record, 1)
+        self.assertEqual(len(queue.claim(10)), 1)
+        self.assertEqual(queue.claim(10), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        job, = queue.claim(10)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_worker_does_not_finish(self):
+        """Итог пишет только воркер, который держит задачу сейчас"""
+        queue.enqueue(record, 1)
+        stale, = queue.claim(10)
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        current, = queue.claim(10)
+        self.assertTrue(queue.run(stale))
+        self.assertTrue(Job.objects.filter(pk=current.pk).exists())
+        self.assertTrue(queue.run(current))
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_jobs_command(self):
+        for value in range(3):
+            queue.enqueue(record, value)
+        out = StringIO()
+        call_command('run_jobs', once=True, batch=2, stdout=out)
+        self.assertIn('Задач выполнено: 3, упало: 0', out.getvalue())
+        self.assertEqual(calls, [0, 1, 2])
+
+
+# eager-задачи ждут коммита, а TestCase не коммитит
+@override_settings(JOBS_EAGER=True)
+class EagerTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_after_commit(self):
+        """С JOBS_EAGER задача выполняется после коммита, без очереди"""
+        with transaction.atomic():
+            queue.enqueue(record, 'после коммита')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['после коммита'])
+        queue.enqueue(record, 'сразу')
+        self.assertEqual(calls, ['после коммита', 'сразу'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_rollback_drops_task(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                queue.enqueue(record, 'откат')
+                raise RuntimeError
+        self.assertEqual(calls, [])
+
+    def test_failure_is_logged(self):
+        """Ошибка задачи не выходит наружу, её записи откатываются"""
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.enqueue(fail)
+        self.assertFalse(Job.objects.exists())
+        with self.assertRaises(TypeError):
+            queue.enqueue(record, object())
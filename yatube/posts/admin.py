@@ -1,22 +1,235 @@
+import datetime
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models
+from django.db.models import Min, QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from django.utils.functional import cached_property
 
+from . import search
 from .models import Group, Comment, Post
 
 
-class CommentInline(admin.TabularInline):
+def estimate_rows(model, using):
+    """Число строк таблицы по статистике СУБД или None, если её нет."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        # появляется после ANALYZE; первое число -- строк в таблице
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0].split('.')[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списка без COUNT(*) по всей таблице.
+
+    Неотфильтрованный список берёт число строк из статистики СУБД;
+    маленькие таблицы и отфильтрованные выборки считаются точно.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset.count()
+
+
+def _next_period(day, kind):
+    if kind == 'year':
+        return datetime.date(day.year + 1, 1, 1)
+    if kind == 'month':
+        return (day.replace(day=1) + datetime.timedelta(days=32)).replace(
+            day=1)
+    return day + datetime.timedelta(days=1)
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """dates() прыжками по индексу поля вместо DISTINCT по всей выборке.
+
+    На каждый найденный год, месяц или день -- один MIN() от начала
+    следующего периода; так строит уровни date_hierarchy админка.
+    """
+
+    def dates(self, field_name, kind, order='ASC'):
+        queryset = self.order_by()
+        is_datetime = isinstance(
+            self.model._meta.get_field(field_name), models.DateTimeField)
+        periods = []
+        value = queryset.aggregate(first=Min(field_name))['first']
+        while value is not None:
+            if is_datetime:
+                if timezone.is_aware(value):
+                    value = timezone.localtime(value)
+                day = value.date()
+            else:
+                day = value
+            if kind == 'year':
+                day = day.replace(month=1, day=1)
+            elif kind == 'month':
+                day = day.replace(day=1)
+            periods.append(day)
+            start = _next_period(day, kind)
+            if is_datetime:
+                start = datetime.datetime.combine(start, datetime.time.min)
+                if settings.USE_TZ:
+                    start = timezone.make_aware(start)
+            value = queryset.filter(
+                **{f'{field_name}__gte': start}
+            ).aggregate(first=Min(field_name))['first']
+        return periods if order == 'ASC' else periods[::-1]
+
+
+class IndexedDateHierarchyMixin:
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            queryset.model, queryset.query.chain(), queryset.db)
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, который берёт выбранный объект из строки формы.
+
+    Обычный AutocompleteSelect ищет подпись выбранного значения
+    отдельным запросом, в list_editable это запрос на каждую строку.
+    """
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.preloaded
+        selected = {str(v) for v in value if v not in ('', None)}
+        if obj is None or selected != {str(obj.pk)}:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj),
+            True, len(options)))
+        return [(None, options, 0)]
+
+
+class PreloadedForm(forms.ModelForm):
+    """Передаёт автокомплитам связанные объекты, уже лежащие в instance."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, PreloadedAutocompleteSelect):
+                continue
+            model_field = self.instance._meta.get_field(name)
+            if model_field.is_cached(self.instance):
+                widget.preloaded = getattr(self.instance, name)
+
+
+class PreloadedAutocompleteMixin:
+    form = PreloadedForm
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class CommentFormSet(BaseInlineFormSet):
+    """Показывает комментарии поста страницами по per_page."""
+    per_page = 20
+    page = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            offset = (self.page - 1) * self.per_page
+            rows = list(super().get_queryset().order_by('-created', '-pk')[
+                offset:offset + self.per_page + 1])
+            self.has_next = len(rows) > self.per_page
+            self._queryset = rows[:self.per_page]
+        return self._queryset
+
+
+class CommentInline(PreloadedAutocompleteMixin, admin.TabularInline):
     model = Comment
+    formset = CommentFormSet
+    template = 'admin/posts/comment_inline.html'
+    autocomplete_fields = ('author',)
+    extra = 1
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        try:
+            formset.page = max(int(request.GET.get('comments_page', 1)), 1)
+        except ValueError:
+            formset.page = 1
+        return formset
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedDateHierarchyMixin, PreloadedAutocompleteMixin,
+                admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
     inlines = [
         CommentInline,
     ]
 
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', self.form)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # полнотекстовый индекс вместо LIKE '%...%' по всей таблице
+        if not search_term:
+            return queryset, False
+        return search.posts(queryset, search_term), False
+
+
+class CommentAdmin(IndexedDateHierarchyMixin, PreloadedAutocompleteMixin,
+                   admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    date_hierarchy = 'created'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    search_fields = ('title', 'slug')
+
 
-admin.site.register(Post, PostAdmin),
-admin.site.register(Group)
+admin.site.register(Post, PostAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Group, GroupAdmin)
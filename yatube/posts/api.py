@@ -0,0 +1,138 @@
+"""JSON API лент только для чтения.
+
+Запросы и курсоры те же, что у HTML-видов, но строки берутся через
+values() и сразу превращаются в словари, без экземпляров моделей.
+Валидаторы и Cache-Control -- те же, что у HTML-лент (см.
+feed_cache.conditional).
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+
+from core.database.routers import replica_reads
+
+from . import feed_cache, timeline
+from .models import Comment, Group, Post, User
+from .utils import paginator_list
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author__username', 'group__slug')
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+def _error(detail, status):
+    return JsonResponse(
+        {'detail': detail}, status=status,
+        json_dumps_params={'ensure_ascii': False})
+
+
+def _post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'].isoformat(),
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': default_storage.url(row['image']) if row['image'] else None,
+    }
+
+
+def _comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'].isoformat(),
+        'author': row['author__username'],
+    }
+
+
+def _page(page_obj, serialize):
+    paginator = page_obj.paginator
+    return {
+        'results': [serialize(row) for row in page_obj],
+        'next': paginator.next_cursor if page_obj.has_next() else None,
+        'previous': paginator.previous_cursor,
+    }
+
+
+def _feed(request, posts, view, *namespaces, **options):
+    cache_key = feed_cache.page_key(view, request, *namespaces)
+    page_obj = paginator_list(
+        request, posts.values(*POST_FIELDS), cache_key=cache_key, **options)
+    return JsonResponse(
+        _page(page_obj, _post), json_dumps_params={'ensure_ascii': False})
+
+
+@replica_reads
+@feed_cache.public_for_anonymous
+@feed_cache.conditional(lambda request: ('index',))
+def index(request):
+    return _feed(request, Post.objects.all(), 'api:index', 'index')
+
+
+@replica_reads
+@feed_cache.public_for_anonymous
+@feed_cache.conditional(lambda request, slug: (f'group:{slug}',))
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return _error('Не найдено', 404)
+    posts = Post.objects.filter(group_id=group_id)
+    return _feed(request, posts, 'api:group', f'group:{slug}')
+
+
+@replica_reads
+@feed_cache.public_for_anonymous
+@feed_cache.conditional(lambda request, username: (f'profile:{username}',))
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return _error('Не найдено', 404)
+    posts = Post.objects.filter(author_id=author_id)
+    return _feed(request, posts, 'api:profile', f'profile:{username}')
+
+
+@replica_reads
+@feed_cache.public_for_anonymous
+@feed_cache.conditional(lambda request, post_id: (f'post:{post_id}',))
+def post_detail(request, post_id):
+    """Пост и страница его комментариев (?after= листает комментарии)."""
+    row = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if row is None:
+        return _error('Не найдено', 404)
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_FIELDS)
+    page_obj = paginator_list(
+        request, comments, key='created',
+        cache_key=feed_cache.page_key(
+            'api:comments', request, f'post:{post_id}'),
+        per_page=settings.N_COMMENTS,
+    )
+    data = _post(row)
+    data['comments'] = _page(page_obj, _comment)
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def _follow_namespaces(request):
+    return (f'follow:{request.user.pk}',)
+
+
+@replica_reads
+@feed_cache.public_for_anonymous
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужно войти', 401)
+    return _follow_feed(request)
+
+
+@feed_cache.conditional(_follow_namespaces)
+def _follow_feed(request):
+    namespace = f'follow:{request.user.pk}'
+    if timeline.enabled():
+        return _feed(
+            request, Post.objects.all(), 'api:follow', namespace,
+            paginator_class=timeline.TimelinePaginator, user=request.user)
+    posts = Post.objects.filter(author__following__user=request.user)
+    return _feed(request, posts, 'api:follow', namespace)
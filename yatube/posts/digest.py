@@ -0,0 +1,111 @@
+"""Письма подписчикам о новых постах их авторов.
+
+Не письмо на каждый пост, а одно письмо со всеми постами с прошлого
+письма: manage.py send_digests запускается раз в DIGEST_WINDOW (cron).
+Подписчики обрабатываются пачками по DIGEST_BATCH: несколько запросов
+на пачку, а не на подписчика, и письма пачки уходят одним send_messages
+через одно открытое соединение, как в send_mass_mail.
+
+Отметка Digest.sent_until ставится после отправки пачки: при сбое
+посередине письмо может уйти повторно, но посты не потеряются. Посты
+последних SETTLE секунд ждут следующего письма: транзакция, которая их
+пишет, могла ещё не закоммититься, и они оказались бы до отметки.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import Digest, Follow, Post, User
+
+SUBJECT = 'Новые посты в ваших подписках'
+SETTLE = 10
+
+
+def _recipient_chunks(size):
+    """Подписчики с email пачками по size, по возрастанию pk."""
+    recipients = User.objects.exclude(email='').filter(
+        pk__in=Follow.objects.values('user_id'),
+    ).order_by('pk').values_list(
+        'pk', 'username', 'email', 'digest__sent_until')
+    last = 0
+    while True:
+        chunk = list(recipients.filter(pk__gt=last)[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1][0]
+
+
+def _posts_by_reader(since, now):
+    """Новые посты для читателей since: {user_id: момент}; новые сверху."""
+    authors = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+            user_id__in=since).values_list('user_id', 'author_id'):
+        authors[author_id].append(user_id)
+    posts = Post.objects.filter(
+        author_id__in=authors,
+        pub_date__gt=min(since.values()),
+        pub_date__lte=now,
+    ).order_by('-pub_date', '-pk').values(
+        'pk', 'author_id', 'author__username', 'text', 'pub_date')
+    found = defaultdict(list)
+    for post in posts:
+        for user_id in authors[post['author_id']]:
+            if post['pub_date'] > since[user_id]:
+                found[user_id].append(post)
+    return found
+
+
+def batches(window=None, batch_size=None, now=None):
+    """Письма пачками: (сообщения, id получателей) на пачку подписчиков.
+
+    Подписчику, которому писем ещё не было, собираются посты за window
+    секунд; подписчики без новых постов письма не получают.
+    """
+    now = now or timezone.now() - timedelta(seconds=SETTLE)
+    window = settings.DIGEST_WINDOW if window is None else window
+    first_since = now - timedelta(seconds=window)
+    template = get_template('posts/email/digest.txt')
+    for chunk in _recipient_chunks(batch_size or settings.DIGEST_BATCH):
+        since = {
+            user_id: sent_until or first_since
+            for user_id, _, _, sent_until in chunk
+        }
+        found = _posts_by_reader(since, now)
+        messages = []
+        for user_id, username, email, _ in chunk:
+            posts = found.get(user_id)
+            if not posts:
+                continue
+            body = template.render({
+                'username': username,
+                'posts': posts[:settings.DIGEST_POSTS],
+                'total': len(posts),
+                'site_url': settings.SITE_URL,
+            })
+            messages.append(EmailMessage(SUBJECT, body, to=[email]))
+        yield messages, list(found)
+
+
+def _mark_sent(user_ids, now):
+    Digest.objects.bulk_create(
+        [Digest(user_id=user_id, sent_until=now) for user_id in user_ids],
+        ignore_conflicts=True)
+    Digest.objects.filter(user_id__in=user_ids).update(sent_until=now)
+
+
+def send(window=None, batch_size=None, connection=None):
+    """Рассылает письма; возвращает, сколько отправлено."""
+    now = timezone.now() - timedelta(seconds=SETTLE)
+    sent = 0
+    connection = connection or get_connection()
+    with connection:
+        for messages, user_ids in batches(window, batch_size, now):
+            if messages:
+                sent += connection.send_messages(messages) or 0
+                _mark_sent(user_ids, now)
+    return sent
@@ -0,0 +1,148 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Записи идут через iterator(chunk_size=...) и сразу превращаются в
+строки NDJSON или CSV, так что в памяти одновременно лежит не больше
+одной пачки. Формат совпадает с тем, что читает import_posts.
+Подписки не имеют даты и выгружаются целиком.
+
+Граница инкрементальной выгрузки -- пара (дата, pk) последней отданной
+записи: записи с той же датой, но большим pk, не теряются. Записи
+последних SETTLE секунд ждут следующей выгрузки: транзакция, которая их
+пишет, могла ещё не закоммититься, и они оказались бы до границы.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Comment, Follow, Post
+
+KINDS = ('post', 'comment', 'follow')
+CSV_FIELDS = (
+    'type', 'id', 'post', 'user', 'author', 'group', 'text',
+    'pub_date', 'created', 'image',
+)
+CHUNK_SIZE = 2000
+SETTLE = 10
+
+
+def _between(queryset, field, since, until):
+    """Записи после since = (дата, pk или None) и не новее until."""
+    queryset = queryset.order_by(field, 'pk')
+    if since:
+        moment, pk = since
+        after = Q(**{f'{field}__gt': moment})
+        if pk is not None:
+            after |= Q(**{field: moment, 'pk__gt': pk})
+        queryset = queryset.filter(after)
+    if until:
+        queryset = queryset.filter(**{f'{field}__lte': until})
+    return queryset
+
+
+def _posts(since, until):
+    rows = _between(Post.objects, 'pub_date', since, until).values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image')
+    return (
+        {
+            'type': 'post', 'id': pk, 'author': author, 'group': group,
+            'text': text, 'pub_date': pub_date.isoformat(),
+            'image': image or None,
+        }
+        for pk, author, group, text, pub_date, image in rows.iterator(
+            chunk_size=CHUNK_SIZE)
+    )
+
+
+def _comments(since, until):
+    rows = _between(Comment.objects, 'created', since, until).values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created')
+    return (
+        {
+            'type': 'comment', 'id': pk, 'post': post, 'author': author,
+            'text': text, 'created': created.isoformat(),
+        }
+        for pk, post, author, text, created in rows.iterator(
+            chunk_size=CHUNK_SIZE)
+    )
+
+
+def _follows(since, until):
+    rows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username')
+    return (
+        {'type': 'follow', 'user': user, 'author': author}
+        for user, author in rows.iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+SOURCES = {'post': _posts, 'comment': _comments, 'follow': _follows}
+DATE_FIELDS = {'post': 'pub_date', 'comment': 'created'}
+
+
+def records(kinds=KINDS, since=None, marks=None):
+    """Записи выбранных типов.
+
+    since -- {тип: (pub_date/created, pk или None)}, выгружается только
+    то, что после границы. Если передан marks, записи моложе SETTLE
+    откладываются, а в marks записывается граница последней отданной
+    записи каждого типа -- для следующей инкрементальной выгрузки.
+    """
+    since = since or {}
+    until = None
+    if marks is not None:
+        until = timezone.now() - timedelta(seconds=SETTLE)
+    for kind in kinds:
+        for row in SOURCES[kind](since.get(kind), until):
+            if marks is not None and kind in DATE_FIELDS:
+                marks[kind] = (row[DATE_FIELDS[kind]], row['id'])
+            yield row
+
+
+def ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def as_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+FORMATS = {'ndjson': ndjson, 'csv': as_csv}
+
+
+def encode(lines, compress=False, buffer_size=64 * 1024):
+    """Байты для записи или отдачи; с compress -- поток gzip.
+
+    Строки копятся до buffer_size, чтобы не дробить вывод и сжатие.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,229 @@
+"""Версионированный кэш лент.
+
+Каждая лента зависит от нескольких пространств имён: index,
+group:<slug>, profile:<username>, follow:<user_id>, post:<id>. У каждого
+пространства есть поколение -- метка времени последней записи в
+микросекундах. Поколения входят в ключи кэша, поэтому запись поста,
+комментария или подписки делает старые ключи недостижимыми без
+перебора и без очистки всего кэша, а TTL можно держать большим.
+
+Те же поколения служат валидаторами HTTP: conditional() строит из них
+ETag и Last-Modified, так что 304 отдаётся без запросов к базе. Они же
+входят в ключ целых анонимных страниц (anonymous_page_cache): запись
+поста сдвигает только index, его группу и профиль автора, остальные
+страницы остаются в кэше.
+
+Поколения -- это ещё и время записи. Если вид читает с реплики
+(core.database.routers), а поколение моложе REPLICA_LAG, реплика могла
+его ещё не получить: такая страница кэшируется только на REPLICA_LAG
+и не получает валидаторов, иначе устаревшая копия жила бы под новым
+ключом.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.database import routers
+
+PAGE_PARAMS = ('after', 'before', 'page')
+
+
+def _key(namespace):
+    return f'feed:gen:{namespace}'
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def generations(*namespaces):
+    """Текущие поколения; отсутствующие заводятся текущим временем."""
+    keys = [_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            now = _now()
+            cache.add(key, now, None)
+            # кэш может ничего не хранить (DummyCache) или успеть вытеснить
+            found[key] = cache.get(key, now)
+    result = [found[key] for key in keys]
+    _note_lag(result)
+    return result
+
+
+def _note_lag(found):
+    reads = routers.current()
+    if reads is not None and found:
+        if _now() - max(found) < settings.REPLICA_LAG * 10 ** 6:
+            reads.lagging = True
+
+
+def lagging():
+    """Страница читается с реплики, которая может не видеть её записей."""
+    reads = routers.current()
+    return reads is not None and reads.lagging
+
+
+def timeout():
+    """TTL закэшированных лент; пока реплика может отставать -- короткий."""
+    return settings.REPLICA_LAG if lagging() else settings.FEED_CACHE_TIMEOUT
+
+
+def _set_generations(namespaces):
+    now = _now()
+    cache.set_many({_key(namespace): now for namespace in namespaces}, None)
+
+
+def bump(*namespaces):
+    """Сдвигает поколения: всё закэшированное по ним устаревает.
+
+    Сдвиг повторяется после коммита: иначе читатель, успевший между
+    записью и коммитом, положил бы старые данные под новым поколением.
+    """
+    _set_generations(namespaces)
+    transaction.on_commit(lambda: _set_generations(namespaces))
+
+
+def page_key(view, request, *namespaces):
+    """Ключ страницы ленты: вид, поколения и параметры курсора."""
+    parts = [view, *map(str, generations(*namespaces))]
+    parts += [request.GET.get(param, '') for param in PAGE_PARAMS]
+    digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+    return f'feed:{view}:{digest}'
+
+
+def context(key):
+    return {
+        'feed_cache_key': key,
+        'feed_cache_timeout': timeout(),
+    }
+
+
+def _page_generations(request, namespaces, kwargs):
+    """Поколения страницы; считаются один раз на запрос."""
+    if not hasattr(request, '_feed_generations'):
+        spaces = namespaces(request, **kwargs)
+        request._feed_generations = spaces and generations(*spaces)
+    return request._feed_generations
+
+
+def _identity(request):
+    """Чем страница отличается для вошедшего пользователя.
+
+    CSRF-cookie входит сюда потому, что в формах страницы лежит токен:
+    после нового входа старая копия отправляла бы устаревший.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return ''
+    return f'{user.pk}:{request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")}'
+
+
+def conditional(namespaces):
+    """condition() с валидаторами из поколений страницы.
+
+    namespaces(request, **kwargs) -- пространства, от которых зависит
+    страница, или None, если проверять нечего (вид сам ответит 404).
+    Last-Modified отдаётся только анонимам: у личной страницы важен
+    ещё и пользователь, а его учитывает только ETag.
+    """
+
+    def etag(request, **kwargs):
+        found = _page_generations(request, namespaces, kwargs)
+        if not found or lagging():
+            return None
+        parts = [request.path, _identity(request), *map(str, found)]
+        parts += [request.GET.get(param, '') for param in PAGE_PARAMS]
+        return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        found = _page_generations(request, namespaces, kwargs)
+        if not found or lagging() or _identity(request):
+            return None
+        return datetime.fromtimestamp(max(found) / 10 ** 6, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def public_for_anonymous(view):
+    """Cache-Control и Vary для страниц лент.
+
+    Анонимный ответ можно хранить общим кэшам FEED_HTTP_MAX_AGE секунд,
+    личный -- только браузеру и с перепроверкой по ETag.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            max_age = settings.FEED_HTTP_MAX_AGE
+            if lagging():
+                max_age = min(max_age, settings.REPLICA_LAG)
+            patch_cache_control(response, public=True, max_age=max_age)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def anonymous_page_cache(namespaces):
+    """Кэш целых ответов для анонимов.
+
+    Ключ -- путь, параметры страницы и поколения namespaces, поэтому
+    сбрасывать ничего не нужно: после записи старые ответы просто
+    недостижимы и истекают по FEED_CACHE_TIMEOUT. Заголовок
+    X-Page-Cache показывает HIT, MISS или BYPASS.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            found = None
+            if (settings.ANONYMOUS_PAGE_CACHE
+                    and request.method in ('GET', 'HEAD')
+                    and not request.user.is_authenticated):
+                found = _page_generations(request, namespaces, kwargs)
+            if not found:
+                response = view(request, *args, **kwargs)
+                response['X-Page-Cache'] = 'BYPASS'
+                return response
+            parts = [request.path, *map(str, found)]
+            parts += [request.GET.get(param, '') for param in PAGE_PARAMS]
+            digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+            key = f'feed:response:{digest}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'HIT'
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(
+                    key, (response.content, response['Content-Type']),
+                    timeout())
+            response['X-Page-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def feed_page(namespaces):
+    """Всё HTTP-кэширование страницы ленты одним декоратором."""
+
+    def decorator(view):
+        view = anonymous_page_cache(namespaces)(view)
+        view = conditional(namespaces)(view)
+        return public_for_anonymous(view)
+    return decorator
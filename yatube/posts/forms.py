@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Post, Comment
+from .uploads import inspect_image
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +9,23 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # негодный файл убираем до ImageField: тот разобрал бы его целиком
+        self.image_error = None
+        image = self.files.get('image')
+        if image is not None:
+            self.image_error = (
+                getattr(image, 'rejected', None) or inspect_image(image))
+        if self.image_error:
+            self.files = self.files.copy()
+            self.files.pop('image')
+
+    def clean_image(self):
+        if self.image_error:
+            raise forms.ValidationError(self.image_error)
+        return self.cleaned_data['image']
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет материализованные ленты подписок с таблицей подписок '
+        'и, с --repair, исправляет их'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='только эти пользователи (по умолчанию все читатели)')
+        parser.add_argument('--repair', action='store_true')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(
+            pk__in=Follow.objects.values('user_id')
+        ) | User.objects.filter(
+            pk__in=TimelineEntry.objects.values('user_id')
+        )
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        total_missing = total_stale = broken = 0
+        for user in users.distinct().order_by('pk').iterator():
+            with transaction.atomic():
+                missing, stale = timeline.check(user, options['repair'])
+            if missing or stale:
+                broken += 1
+                self.stdout.write(
+                    f'{user.username}: не хватает {missing}, лишних {stale}')
+            total_missing += missing
+            total_stale += stale
+        verb = 'исправлено' if options['repair'] else 'найдено'
+        self.stdout.write(
+            f'Лент с расхождениями: {broken}; {verb} недостающих записей: '
+            f'{total_missing}, лишних: {total_stale}')
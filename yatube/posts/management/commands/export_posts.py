@@ -0,0 +1,80 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии и подписки в NDJSON или CSV, '
+        'целиком или начиная с границы по дате'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=export.KINDS,
+            help='что выгружать (по умолчанию всё)')
+        parser.add_argument(
+            '--format', choices=sorted(export.FORMATS), default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='файл; по умолчанию стандартный вывод')
+        parser.add_argument(
+            '--since', help='выгружать только записи новее этой даты (ISO)')
+        parser.add_argument(
+            '--state', help='JSON с границами по типам: читается перед '
+                            'выгрузкой и обновляется после неё')
+
+    def handle(self, *args, **options):
+        since = self.read_state(options['state'])
+        if options['since']:
+            moment = parse_datetime(options['since'])
+            if moment is None:
+                raise CommandError(f'Непонятная дата {options["since"]}')
+            since = dict.fromkeys(export.DATE_FIELDS, (moment, None))
+        marks = {}
+        rows = export.records(options['kind'] or export.KINDS, since, marks)
+        chunks = export.encode(
+            export.FORMATS[options['format']](rows), options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = self.write(chunks, output)
+        else:
+            written = self.write(chunks, sys.stdout.buffer)
+        if options['state']:
+            state = {
+                kind: (moment.isoformat(), pk)
+                for kind, (moment, pk) in since.items()
+            }
+            state.update(marks)
+            with open(options['state'], 'w') as state_file:
+                json.dump(state, state_file)
+        self.stderr.write(f'Записано байт: {written}; границы: {marks}')
+
+    def read_state(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path) as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        since = {}
+        for kind, value in state.items():
+            # старый формат состояния -- одна дата без pk
+            moment, pk = value if isinstance(value, list) else (value, None)
+            since[kind] = (parse_datetime(moment), pk)
+        return since
+
+    def write(self, chunks, output):
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+        output.flush()
+        return written
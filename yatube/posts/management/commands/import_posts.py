@@ -0,0 +1,353 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import feed_cache, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import explicit_dates
+
+MAX_ERRORS_SHOWN = 20
+FOLLOWERS_CHUNK = 1000
+
+
+class LookupMap:
+    """Отображение ключ -> id с ограниченным размером.
+
+    Недостающие ключи пачки добираются одним запросом; самые давние
+    записи вытесняются, поэтому память не растёт с размером файла.
+    """
+
+    def __init__(self, queryset, field, limit=10000, create=None):
+        self.queryset = queryset
+        self.field = field
+        self.limit = limit
+        self.create = create
+        self.ids = OrderedDict()
+
+    def fetch(self, keys):
+        return dict(self.queryset.filter(
+            **{f'{self.field}__in': keys}).values_list(self.field, 'pk'))
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if missing:
+            found = self.fetch(missing)
+            if self.create and len(found) < len(missing):
+                self.create(missing - set(found))
+                found.update(self.fetch(missing - set(found)))
+            self.ids.update(found)
+        result = {}
+        for key in keys:
+            if key in self.ids:
+                self.ids.move_to_end(key)
+                result[key] = self.ids[key]
+        while len(self.ids) > self.limit:
+            self.ids.popitem(last=False)
+        return result
+
+
+def _create_users(usernames):
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(username=username, password=password) for username in usernames
+    ], ignore_conflicts=True)
+
+
+def _create_groups(slugs):
+    Group.objects.bulk_create([
+        Group(title=slug, slug=slug, description='') for slug in slugs
+    ], ignore_conflicts=True)
+
+
+def _source_id(record, field='id'):
+    # в CSV id -- строка, в NDJSON -- число
+    value = record.get(field)
+    return str(value) if value not in (None, '') else None
+
+
+def _inserted_pks(posts):
+    """pk постов после bulk_create, в порядке вставки."""
+    if connection.features.can_return_ids_from_bulk_insert:
+        return [post.pk for post in posts]
+    # SQLite id не возвращает. До коммита в таблицу пишет только эта
+    # транзакция, а AUTOINCREMENT выдаёт id по возрастанию: последние
+    # len(posts) id -- наши
+    return sorted(Post.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(posts)])
+
+
+def _date(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'непонятная дата {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии и подписки из NDJSON или CSV '
+        'пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='файл NDJSON/CSV или - для стандартного ввода')
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images-dir', help='каталог, относительно которого ищутся '
+                                 'картинки из поля image')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='создавать неизвестных авторов и группы')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.counts = {'post': 0, 'comment': 0, 'follow': 0, 'skipped': 0}
+        self.errors_shown = 0
+        self.users = LookupMap(
+            User.objects.all(), 'username',
+            create=_create_users if options['create_missing'] else None)
+        self.groups = LookupMap(
+            Group.objects.all(), 'slug',
+            create=_create_groups if options['create_missing'] else None)
+        # id постов из файла -> id вставленных: на них ссылаются комментарии.
+        # Выгрузка пишет все посты до комментариев, поэтому карта хранится
+        # целиком, без вытеснения: это два числа на пост
+        self.posts = {}
+        started = time.perf_counter()
+        stream = self.open(options['path'])
+        try:
+            records = self.records(stream, self.detect_format(options))
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                self.import_batch(batch)
+                if options['verbosity'] > 1:
+                    self.report(started)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        # bulk_create не шлёт сигналов: досчитываем то, что они делают
+        call_command('rebuild_author_stats', stdout=io.StringIO())
+        if timeline.enabled():
+            self.stdout.write(
+                'Ленты подписок не разложены: '
+                'запустите manage.py check_timelines --repair')
+        self.report(started)
+
+    def open(self, path):
+        if path == '-':
+            return sys.stdin
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
+
+    def detect_format(self, options):
+        if options['format']:
+            return options['format']
+        return 'csv' if options['path'].endswith('.csv') else 'ndjson'
+
+    def records(self, stream, file_format):
+        """Пары (номер строки, запись); битые строки сразу отбрасываются."""
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                self.error(number, f'не JSON: {error}')
+                continue
+            if not isinstance(record, dict):
+                self.error(number, 'ожидался объект')
+                continue
+            yield number, record
+
+    def error(self, number, message):
+        self.counts['skipped'] += 1
+        if self.errors_shown < MAX_ERRORS_SHOWN:
+            self.stderr.write(f'строка {number}: {message}')
+        self.errors_shown += 1
+
+    def import_batch(self, batch):
+        by_type = {'post': [], 'comment': [], 'follow': []}
+        for number, record in batch:
+            kind = record.get('type') or 'post'
+            if kind not in by_type:
+                self.error(number, f'неизвестный тип {kind!r}')
+                continue
+            by_type[kind].append((number, record))
+        users = self.users.resolve({
+            record.get(field)
+            for number, record in batch for field in ('author', 'user')
+        })
+        groups = self.groups.resolve({
+            record.get('group') for number, record in by_type['post']})
+        # картинки копируются до транзакции; при откате они удаляются
+        sources, posts = self.build_posts(by_type['post'], users, groups)
+        try:
+            with transaction.atomic():
+                with explicit_dates(Post, 'pub_date'):
+                    Post.objects.bulk_create(posts)
+                self.posts.update(
+                    (source, pk)
+                    for source, pk in zip(sources, _inserted_pks(posts))
+                    if source is not None)
+                comments = self.build_comments(by_type['comment'], users)
+                follows = self.build_follows(by_type['follow'], users)
+                with explicit_dates(Comment, 'created'):
+                    Comment.objects.bulk_create(comments)
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        except BaseException:
+            for post in posts:
+                if post.image:
+                    default_storage.delete(post.image.name)
+            raise
+        self.counts['post'] += len(posts)
+        self.counts['comment'] += len(comments)
+        self.counts['follow'] += len(follows)
+        self.after_batch(posts, comments, follows)
+
+    def build_posts(self, records, users, groups):
+        """id постов в файле и несохранённые посты, в одном порядке."""
+        sources, posts = [], []
+        for number, record in records:
+            author = users.get(record.get('author'))
+            if author is None:
+                self.error(number, f'нет автора {record.get("author")!r}')
+                continue
+            group = record.get('group') or None
+            if group and group not in groups:
+                self.error(number, f'нет группы {group!r}')
+                continue
+            if not record.get('text'):
+                self.error(number, 'пустой текст')
+                continue
+            try:
+                pub_date = _date(record.get('pub_date'))
+                image = self.copy_image(record.get('image'))
+            except (OSError, ValueError) as error:
+                self.error(number, str(error))
+                continue
+            sources.append(_source_id(record))
+            posts.append(Post(
+                author_id=author, group_id=groups.get(group),
+                text=record['text'], pub_date=pub_date, image=image,
+            ))
+        return sources, posts
+
+    def build_comments(self, records, users):
+        """post комментария -- id поста в файле, а не в базе."""
+        comments = []
+        for number, record in records:
+            author = users.get(record.get('author'))
+            post = self.posts.get(_source_id(record, 'post'))
+            try:
+                created = _date(record.get('created'))
+            except ValueError as error:
+                self.error(number, f'плохой комментарий: {error}')
+                continue
+            if author is None or post is None:
+                self.error(number, 'нет автора или поста комментария')
+                continue
+            comments.append(Comment(
+                author_id=author, post_id=post,
+                text=record.get('text') or '', created=created,
+            ))
+        return comments
+
+    def build_follows(self, records, users):
+        """Только новые подписки: уже существующие и повторы не считаются."""
+        pairs = {}
+        for number, record in records:
+            user = users.get(record.get('user'))
+            author = users.get(record.get('author'))
+            if user is None or author is None or user == author:
+                self.error(number, 'нет пользователя или автора подписки')
+                continue
+            pairs[user, author] = Follow(user_id=user, author_id=author)
+        if pairs:
+            existing = Follow.objects.filter(
+                user_id__in={user for user, _ in pairs},
+                author_id__in={author for _, author in pairs},
+            ).values_list('user_id', 'author_id')
+            for pair in existing:
+                pairs.pop(pair, None)
+        return list(pairs.values())
+
+    def copy_image(self, name):
+        """Копирует картинку из --images-dir в хранилище, отдаёт её имя."""
+        if not name:
+            return ''
+        directory = self.options['images_dir']
+        if not directory:
+            raise ValueError('картинка указана, но не задан --images-dir')
+        root = os.path.realpath(directory)
+        path = os.path.realpath(os.path.join(root, name))
+        if not path.startswith(root + os.sep):
+            raise ValueError(f'картинка {name!r} вне --images-dir')
+        with open(path, 'rb') as source:
+            return default_storage.save(
+                f'posts/{os.path.basename(path)}', File(source))
+
+    def after_batch(self, posts, comments, follows):
+        namespaces = {'index'}
+        namespaces.update(
+            f'profile:{username}' for username in User.objects.filter(
+                pk__in={post.author_id for post in posts}
+            ).values_list('username', flat=True))
+        namespaces.update(
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk__in={post.group_id for post in posts}
+            ).values_list('slug', flat=True))
+        namespaces.update(
+            f'post:{comment.post_id}' for comment in comments)
+        namespaces.update(f'follow:{follow.user_id}' for follow in follows)
+        feed_cache.bump(*namespaces)
+        followers = Follow.objects.filter(
+            author_id__in={post.author_id for post in posts}
+        ).values_list('user_id', flat=True).distinct().iterator()
+        while True:
+            chunk = list(islice(followers, FOLLOWERS_CHUNK))
+            if not chunk:
+                break
+            feed_cache.bump(*(f'follow:{user_id}' for user_id in chunk))
+        for post in posts:
+            thumbnails.schedule(post.image.name)
+
+    def report(self, started):
+        elapsed = time.perf_counter() - started
+        imported = sum(
+            self.counts[kind] for kind in ('post', 'comment', 'follow'))
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Постов: {self.counts["post"]}, '
+            f'комментариев: {self.counts["comment"]}, '
+            f'подписок: {self.counts["follow"]}, '
+            f'пропущено: {self.counts["skipped"]} '
+            f'за {elapsed:.1f} с ({rate:.0f} записей/с)')
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(name):
+    try:
+        thumbnails.generate(name)
+    except Exception as error:
+        return f'{name}: {error}'
+    return None
+
+
+def _generate_in_worker(name):
+    try:
+        return _generate(name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры всех размеров из THUMBNAIL_GEOMETRIES '
+        'для уже загруженных картинок постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='потоков генерации (Pillow отпускает GIL при обработке)')
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct()
+        )
+        started = time.perf_counter()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                errors = list(pool.map(_generate_in_worker, names))
+        else:
+            errors = [_generate(name) for name in names]
+        for error in filter(None, errors):
+            self.stderr.write(error)
+        failed = len(errors) - errors.count(None)
+        self.stdout.write(
+            f'Картинок обработано: {len(errors) - failed}, '
+            f'с ошибками: {failed}, '
+            f'за {time.perf_counter() - started:.1f} с')
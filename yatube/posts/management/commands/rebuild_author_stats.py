@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import AuthorStats, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='только эти пользователи (по умолчанию все)')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='только показать расхождения, ничего не меняя')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        stored = {}
+        drifted = checked = 0
+        for actual in AuthorStats.objects.actual(users).iterator(
+                chunk_size=options['chunk_size']):
+            user_id = actual.pop('pk')
+            stored[user_id] = actual
+            if len(stored) == options['chunk_size']:
+                drifted += self.sync(stored, options['check'])
+                checked += len(stored)
+                stored = {}
+        drifted += self.sync(stored, options['check'])
+        checked += len(stored)
+        verb = 'расходятся' if options['check'] else 'исправлены'
+        self.stdout.write(
+            f'Проверено авторов: {checked}, {verb}: {drifted}')
+
+    def sync(self, actual, check_only):
+        counters = list(AuthorStats.objects.COUNTERS)
+        current = {
+            stats.pop('user_id'): stats
+            for stats in AuthorStats.objects.filter(
+                user_id__in=actual).values('user_id', *counters)
+        }
+        broken = [
+            AuthorStats(user_id=user_id, **values)
+            for user_id, values in actual.items()
+            if current.get(user_id) != values
+        ]
+        if broken and not check_only:
+            with transaction.atomic():
+                AuthorStats.objects.bulk_create([
+                    stats for stats in broken if stats.user_id not in current
+                ])
+                AuthorStats.objects.bulk_update([
+                    stats for stats in broken if stats.user_id in current
+                ], counters)
+        return len(broken)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс постов и его триггеры '
+        '(после массовых правок в обход Django или ALTER TABLE на SQLite)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='SQLite: слить сегменты FTS5 в один после перестройки')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        started = time.perf_counter()
+        with transaction.atomic(using=options['database']):
+            search.install(connection)
+            search.rebuild(connection, optimize=options['optimize'])
+        self.stdout.write(
+            f'Индекс поиска перестроен за '
+            f'{time.perf_counter() - started:.1f} с')
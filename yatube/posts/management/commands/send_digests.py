@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет подписчикам письма с новыми постами их авторов '
+        'с прошлого письма; запускать раз в DIGEST_WINDOW'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=settings.DIGEST_WINDOW,
+            help='за сколько секунд собирать посты, если писем ещё не было')
+        parser.add_argument(
+            '--batch', type=int, default=settings.DIGEST_BATCH,
+            help='подписчиков в пачке')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sent = digest.send(options['window'], options['batch'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Писем отправлено: {sent} за {elapsed:.1f} с '
+            f'({sent / elapsed if elapsed else 0:.0f} в секунду)')
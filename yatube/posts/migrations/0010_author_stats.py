@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.IntegerField(default=0, verbose_name='постов')),
+                ('comments_count', models.IntegerField(default=0, verbose_name='комментариев')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='подписчиков')),
+                ('following_count', models.IntegerField(default=0, verbose_name='подписок')),
+            ],
+            options={
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, router
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 
 User = get_user_model()
@@ -20,6 +23,16 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что выводит карточка поста, одним запросом без N+1."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='текст',
@@ -49,9 +62,21 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -80,6 +105,13 @@ class Comment(models.Model):
     class Meta:
         verbose_name_plural = 'Комментарии'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'),
+            models.Index(
+                fields=['-created', '-id'], name='comment_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -98,3 +130,133 @@ class Follow(models.Model):
         verbose_name_plural = 'Подписки'
         constraints = [models.UniqueConstraint(
             fields=['user', 'author'], name='unique_follow')]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Строка материализованной ленты подписок (см. posts.timeline)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'], name='unique_timeline_entry')]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+
+def _count_by(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+class AuthorStatsManager(models.Manager):
+    COUNTERS = {
+        'posts_count': (Post, 'author'),
+        'comments_count': (Comment, 'author'),
+        'followers_count': (Follow, 'author'),
+        'following_count': (Follow, 'user'),
+    }
+
+    def actual(self, users=None):
+        """Пересчитанные по таблицам счётчики: values() по пользователям."""
+        users = User.objects.all() if users is None else users
+        return users.annotate(**{
+            name: _count_by(model, field)
+            for name, (model, field) in self.COUNTERS.items()
+        }).values('pk', *self.COUNTERS)
+
+    def _counters(self, users):
+        counters = self.actual(users).get()
+        del counters['pk']
+        return counters
+
+    def rebuild(self, user):
+        # считается там же, куда пишется: реплика могла отстать
+        users = User.objects.using(router.db_for_write(self.model))
+        counters = self._counters(users.filter(pk=user.pk))
+        stats, _ = self.update_or_create(user=user, defaults=counters)
+        return stats
+
+    def for_user(self, user):
+        """Счётчики user; на чтении в базу ничего не пишется.
+
+        Если строки ещё нет, счётчики считаются по таблицам и не
+        сохраняются: строку создают bump и rebuild_author_stats.
+        """
+        try:
+            return user.stats
+        except ObjectDoesNotExist:
+            counters = self._counters(User.objects.filter(pk=user.pk))
+            return self.model(user=user, **counters)
+
+    def bump(self, user_id, **deltas):
+        """Сдвигает счётчики на deltas.
+
+        Если строки ещё нет, при росте она строится с нуля, а при
+        уменьшении ничего не делается: это может быть каскадное удаление
+        самого пользователя, а for_user всё равно посчитает счётчики.
+        """
+        updated = self.filter(user_id=user_id).update(**{
+            name: F(name) + delta for name, delta in deltas.items()
+        })
+        if not updated and min(deltas.values()) > 0:
+            self.rebuild(User(pk=user_id))
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.IntegerField('постов', default=0)
+    comments_count = models.IntegerField('комментариев', default=0)
+    followers_count = models.IntegerField('подписчиков', default=0)
+    following_count = models.IntegerField('подписок', default=0)
+
+    objects = AuthorStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'Статистика авторов'
+
+
+class Digest(models.Model):
+    """До какого момента подписчику отправлены новые посты (posts.digest)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='digest',
+    )
+    sent_until = models.DateTimeField('отправлено по')
+
+    class Meta:
+        verbose_name_plural = 'Письма подписчикам'
@@ -0,0 +1,152 @@
+"""Полнотекстовый поиск по тексту постов.
+
+На SQLite индекс -- таблица FTS5 с внешним содержимым (posts_post), её
+синхронизируют триггеры на вставку, изменение и удаление, поэтому в
+индекс попадают и bulk_create, и правки из админки. На PostgreSQL --
+GIN-индекс по to_tsvector(text). Релевантность отдаётся аннотацией
+rank (чем больше, тем лучше), по ней идёт keyset-пагинация.
+
+Пересоздание таблицы при ALTER TABLE на SQLite теряет триггеры:
+после таких миграций нужен manage.py reindex_search.
+"""
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Group
+
+FTS_TABLE = 'posts_post_fts'
+PG_INDEX = 'posts_post_text_fts'
+PG_CONFIG = 'russian'
+MAX_TERMS = 16
+GROUPS_SHOWN = 5
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+        AFTER UPDATE OF text ON posts_post
+        WHEN old.text IS NOT new.text BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+]
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+PG_INSTALL = [
+    f"""CREATE INDEX IF NOT EXISTS {PG_INDEX} ON posts_post
+        USING GIN (to_tsvector('{PG_CONFIG}', text))""",
+]
+PG_UNINSTALL = [f'DROP INDEX IF EXISTS {PG_INDEX}']
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install(connection):
+    """Создаёт индекс (повторный вызов ничего не ломает)."""
+    if connection.vendor == 'sqlite':
+        _execute(connection, SQLITE_INSTALL)
+    elif connection.vendor == 'postgresql':
+        _execute(connection, PG_INSTALL)
+
+
+def uninstall(connection):
+    if connection.vendor == 'sqlite':
+        _execute(connection, SQLITE_UNINSTALL)
+    elif connection.vendor == 'postgresql':
+        _execute(connection, PG_UNINSTALL)
+
+
+def rebuild(connection, optimize=False):
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    if connection.vendor == 'sqlite':
+        command = f'INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES (%s)'
+        with connection.cursor() as cursor:
+            cursor.execute(command, ['rebuild'])
+            if optimize:
+                cursor.execute(command, ['optimize'])
+    elif connection.vendor == 'postgresql':
+        _execute(connection, [f'REINDEX INDEX {PG_INDEX}'])
+
+
+def terms(query):
+    """Слова запроса; синтаксис FTS5 и tsquery пользователю недоступен."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def posts(queryset, query):
+    """Посты, содержащие все слова запроса, с аннотацией rank."""
+    words = terms(query)
+    if not words:
+        # rank нужен пагинатору и у пустой выдачи
+        return queryset.annotate(
+            rank=Value(0.0, output_field=FloatField())).none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words)
+        # соединение с индексом: скрытая колонка rank FTS5 (bm25,
+        # отрицательный) считается один раз на найденную строку
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = posts_post.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+        )
+        rank = RawSQL(f'-{FTS_TABLE}.rank', (), output_field=FloatField())
+    elif vendor == 'postgresql':
+        # выражение совпадает с индексом, иначе GIN не используется
+        vector = f"to_tsvector('{PG_CONFIG}', text)"
+        tsquery = f"plainto_tsquery('{PG_CONFIG}', %s)"
+        queryset = queryset.extra(
+            where=[
+                f'posts_post.id IN (SELECT id FROM posts_post '
+                f'WHERE {vector} @@ {tsquery})',
+            ],
+            params=[' '.join(words)],
+        )
+        rank = RawSQL(
+            f"ts_rank(to_tsvector('{PG_CONFIG}', posts_post.text), "
+            f'{tsquery})',
+            (' '.join(words),), output_field=FloatField())
+    else:
+        queryset = queryset.filter(
+            reduce(and_, (Q(text__icontains=word) for word in words)))
+        rank = Value(0.0, output_field=FloatField())
+    return queryset.annotate(rank=rank)
+
+
+def groups(query):
+    """Несколько групп, в названии или описании которых есть слово."""
+    words = terms(query)
+    if not words:
+        return Group.objects.none()
+    condition = reduce(or_, (
+        Q(title__icontains=word) | Q(description__icontains=word)
+        for word in words
+    ))
+    return Group.objects.filter(condition).order_by('title')[:GROUPS_SHOWN]
@@ -0,0 +1,159 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.database import routers
+from jobs.queue import enqueue
+
+from . import feed_cache, tasks, thumbnails, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+# поля, которые показываются на страницах лент
+USER_FEED_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_FEED_FIELDS = ('slug', 'title', 'description')
+
+
+def _bump(instance, delta):
+    if isinstance(instance, Post):
+        AuthorStats.objects.bump(instance.author_id, posts_count=delta)
+    elif isinstance(instance, Comment):
+        AuthorStats.objects.bump(instance.author_id, comments_count=delta)
+    else:
+        AuthorStats.objects.bump(instance.author_id, followers_count=delta)
+        AuthorStats.objects.bump(instance.user_id, following_count=delta)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _bump(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def count_deleted(sender, instance, **kwargs):
+    _bump(instance, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def pin_writer(sender, raw=False, **kwargs):
+    # автор изменения читает из default, пока реплики не догонят
+    if not raw:
+        routers.content_written()
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # при смене группы устаревают ленты и старой, и новой группы
+    instance._saved_group_id = instance.__dict__.get('group_id')
+    image = instance.__dict__.get('image')
+    instance._saved_image = getattr(image, 'name', image)
+
+
+def _post_namespaces(post):
+    namespaces = [
+        'index', f'profile:{post.author.username}', f'post:{post.pk}']
+    group_ids = {post.group_id, post._saved_group_id} - {None}
+    namespaces += [
+        f'group:{slug}' for slug in Group.objects.filter(
+            pk__in=group_ids).values_list('slug', flat=True)
+    ]
+    return namespaces
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    feed_cache.bump(*_post_namespaces(instance))
+    # лент подписчиков может быть много: их сдвигает задача
+    enqueue(tasks.bump_followers, instance.author_id)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        feed_cache.bump(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timeline.enabled():
+        enqueue(tasks.fan_out, instance.pk, key=f'fan_out:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timeline.enabled():
+        enqueue(tasks.backfill_timeline, instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    if timeline.enabled():
+        timeline.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, raw=False, **kwargs):
+    image = instance.__dict__.get('image')
+    name = getattr(image, 'name', image)
+    if raw or not name or name == instance._saved_image:
+        return
+    instance._saved_image = name
+    thumbnails.schedule(name)
+
+
+def _feed_fields(instance, fields):
+    # __dict__: отложенное поле не подгружается лишним запросом
+    return tuple(instance.__dict__.get(field) for field in fields)
+
+
+@receiver(post_init, sender=User)
+def remember_user_names(sender, instance, **kwargs):
+    instance._saved_feed_fields = _feed_fields(instance, USER_FEED_FIELDS)
+
+
+@receiver(post_init, sender=Group)
+def remember_group_fields(sender, instance, **kwargs):
+    instance._saved_feed_fields = _feed_fields(instance, GROUP_FEED_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, raw=False, **kwargs):
+    # вход пишет last_login: ленты от этого не устаревают
+    saved = instance._saved_feed_fields
+    current = _feed_fields(instance, USER_FEED_FIELDS)
+    instance._saved_feed_fields = current
+    if created or raw or current == saved:
+        return
+    usernames = {instance.username, saved[0]} - {None}
+    enqueue(tasks.bump_author, instance.pk, *sorted(usernames))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, created, raw=False, **kwargs):
+    saved = instance._saved_feed_fields
+    current = _feed_fields(instance, GROUP_FEED_FIELDS)
+    instance._saved_feed_fields = current
+    if created or raw or current == saved:
+        return
+    slugs = {instance.slug, saved[0]} - {None}
+    enqueue(tasks.bump_group, instance.pk, *sorted(slugs))
@@ -0,0 +1,84 @@
+"""Фоновые задачи постов: то, что не обязано успеть в запросе записи.
+
+Время выполнения этих задач растёт с числом подписчиков автора или
+постов в его профиле, поэтому запрос их только ставит (jobs.queue).
+Миниатюры -- в posts.thumbnails.
+"""
+from jobs.queue import task
+
+from . import feed_cache, timeline
+from .models import Comment, Follow, Group, Post
+
+FOLLOWERS_CHUNK = 1000
+
+
+def _bump_chunked(namespaces):
+    chunk = []
+    for namespace in namespaces:
+        chunk.append(namespace)
+        if len(chunk) == FOLLOWERS_CHUNK:
+            feed_cache.bump(*chunk)
+            chunk = []
+    if chunk:
+        feed_cache.bump(*chunk)
+
+
+def _post_pages(post_ids):
+    """Пространства страниц постов по values_list с их id."""
+    return (
+        f'post:{pk}' for pk in post_ids.order_by().distinct().iterator(
+            chunk_size=FOLLOWERS_CHUNK)
+    )
+
+
+@task('posts.bump_followers')
+def bump_followers(author_id):
+    """Сдвигает поколения лент подписок всех подписчиков автора."""
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True).iterator(chunk_size=FOLLOWERS_CHUNK)
+    _bump_chunked(f'follow:{user_id}' for user_id in followers)
+
+
+@task('posts.bump_author')
+def bump_author(author_id, *usernames):
+    """Страницы, где видно имя автора: после смены имени или логина."""
+    slugs = Group.objects.filter(posts__author_id=author_id).values_list(
+        'slug', flat=True).distinct()
+    feed_cache.bump(
+        'index', *(f'profile:{username}' for username in usernames),
+        *(f'group:{slug}' for slug in slugs))
+    _bump_chunked(_post_pages(Post.objects.filter(
+        author_id=author_id).values_list('pk', flat=True)))
+    # логин виден и в комментариях к чужим постам
+    _bump_chunked(_post_pages(Comment.objects.filter(
+        author_id=author_id).values_list('post_id', flat=True)))
+    bump_followers(author_id)
+
+
+@task('posts.bump_group')
+def bump_group(group_id, *slugs):
+    """Страницы, где видны название и адрес группы."""
+    feed_cache.bump('index', *(f'group:{slug}' for slug in slugs))
+    _bump_chunked(_post_pages(Post.objects.filter(
+        group_id=group_id).values_list('pk', flat=True)))
+
+
+@task('posts.fan_out')
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        # пост удалили раньше, чем до него дошла очередь
+        return
+    timeline.fan_out(post)
+    # ленты могли закэшироваться между bump_followers и раскладкой
+    bump_followers(post.author_id)
+
+
+@task('posts.backfill_timeline')
+def backfill_timeline(user_id, author_id):
+    if not Follow.objects.filter(
+            user_id=user_id, author_id=author_id).exists():
+        # отписался раньше, чем до подписки дошла очередь
+        return
+    timeline.backfill(user_id, author_id)
+    feed_cache.bump(f'follow:{user_id}')
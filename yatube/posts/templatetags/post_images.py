@@ -0,0 +1,18 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, geometry='card'):
+    """Готовая миниатюра image или сама картинка, пока миниатюры нет.
+
+    В отличие от {% thumbnail %} ничего не создаёт и не пишет в запросе:
+    миниатюры ставятся в очередь при сохранении поста или командой
+    pregenerate_thumbnails.
+    """
+    if not image:
+        return None
+    return thumbnails.lookup(image, geometry) or image
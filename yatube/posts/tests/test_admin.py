@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import EstimatedCountPaginator, IndexedDatesQuerySet
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count):
+        start = Post.objects.count()
+        for n in range(start, start + count):
+            author = User.objects.create_user(username=f'author{n}')
+            group = Group.objects.create(
+                title=f'Группа {n}', slug=f'group-{n}', description='')
+            Post.objects.create(author=author, group=group, text=f'пост {n}')
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return queries.captured_queries
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка постов не зависит от числа строк"""
+        self.add_posts(2)
+        few = len(self.changelist_queries())
+        self.add_posts(10)
+        self.assertEqual(len(self.changelist_queries()), few)
+
+    def test_unfiltered_list_uses_estimate(self):
+        """Без фильтров число строк берётся из статистики, без COUNT(*)"""
+        self.add_posts(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.filter(text='пост 0').delete()
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 0):
+            queries = self.changelist_queries()
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']])
+        filtered = self.client.get(
+            reverse('admin:posts_post_changelist'), {'group__id__exact': 0})
+        self.assertEqual(filtered.context['cl'].result_count, 0)
+
+    def test_indexed_dates_match_queryset_dates(self):
+        """Уровни date_hierarchy совпадают с QuerySet.dates"""
+        self.add_posts(3)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    IndexedDatesQuerySet(Post).dates('pub_date', kind),
+                    list(Post.objects.dates('pub_date', kind)))
+
+    def test_comment_inline_is_paginated(self):
+        """Комментарии поста в админке разбиты на страницы"""
+        self.add_posts(1)
+        post = Post.objects.get()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.admin, text=f'комментарий {n}')
+            for n in range(25)
+        )
+        url = reverse('admin:posts_post_change', args=[post.pk])
+        first = self.client.get(url)
+        formset = first.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.initial_form_count(), 20)
+        self.assertContains(first, '?comments_page=2')
+        second = self.client.get(url, {'comments_page': 2})
+        formset = second.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.initial_form_count(), 5)
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'пост {n}')
+            for n in range(settings.N_POSTS + 3)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_page_with_cursors(self):
+        """Ленты отдаются страницами, next ведёт на продолжение"""
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+        ]
+        expected = [post.pk for post in self.posts]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(len(first['results']), settings.N_POSTS)
+                self.assertEqual(first['results'][0], {
+                    'id': self.posts[0].pk,
+                    'text': self.posts[0].text,
+                    'pub_date': self.posts[0].pub_date.isoformat(),
+                    'author': 'writer',
+                    'group': 'api-group',
+                    'image': None,
+                })
+                second = self.client.get(url, {'after': first['next']})
+                second = second.json()
+                self.assertIsNone(second['next'])
+                self.assertEqual(
+                    [row['id'] for row in first['results']]
+                    + [row['id'] for row in second['results']],
+                    expected)
+
+    def test_etag_gives_304_without_queries(self):
+        """Повторный запрос с ETag получает 304, не трогая базу"""
+        url = reverse('api:index')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+        Post.objects.create(author=self.author, text='свежий')
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()['results'][0]['text'], 'свежий')
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с первой страницей комментариев"""
+        post = self.posts[0]
+        Comment.objects.create(post=post, author=self.reader, text='ого')
+        data = self.client.get(
+            reverse('api:post_detail', args=[post.pk])).json()
+        self.assertEqual(data['id'], post.pk)
+        self.assertEqual(
+            [row['text'] for row in data['comments']['results']], ['ого'])
+        missing = self.client.get(
+            reverse('api:post_detail', args=[post.pk + 1000]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа и совпадает с материализованной"""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        plain = self.client.get(url).json()
+        cache.clear()
+        with override_settings(FOLLOW_TIMELINE=True):
+            call_command('check_timelines', repair=True, stdout=StringIO())
+            materialized = self.client.get(url).json()
+        self.assertEqual(plain, materialized)
+        self.assertEqual(
+            [row['id'] for row in plain['results']],
+            [post.pk for post in self.posts[:settings.N_POSTS]])
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import digest
+from ..models import Digest, Follow, Post, User
+
+
+@mock.patch.object(digest, 'SETTLE', 0)
+class DigestTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='digest_author')
+        cls.other = User.objects.create_user(username='digest_other')
+        cls.reader = User.objects.create_user(
+            username='digest_reader', email='reader@example.com')
+        cls.second = User.objects.create_user(
+            username='digest_second', email='second@example.com')
+        cls.silent = User.objects.create_user(username='digest_silent')
+        for user in (cls.reader, cls.second, cls.silent):
+            Follow.objects.create(user=user, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.other)
+        cls.first_post = Post.objects.create(
+            text='первый пост', author=cls.author)
+        cls.other_post = Post.objects.create(
+            text='пост другого автора', author=cls.other)
+
+    def send(self, **options):
+        out = StringIO()
+        call_command('send_digests', stdout=out, **options)
+        return out.getvalue()
+
+    def test_one_email_per_reader(self):
+        """Подписчик с email получает одно письмо со всеми постами"""
+        self.assertIn('Писем отправлено: 2', self.send())
+        emails = {email.to[0]: email.body for email in mail.outbox}
+        self.assertEqual(
+            set(emails), {'reader@example.com', 'second@example.com'})
+        body = emails['reader@example.com']
+        self.assertIn('первый пост', body)
+        self.assertIn('пост другого автора', body)
+        self.assertIn(
+            reverse('posts:post_detail', args=[self.first_post.pk]), body)
+        self.assertNotIn('пост другого автора', emails['second@example.com'])
+
+    def test_next_digest_has_only_new_posts(self):
+        self.send()
+        mail.outbox.clear()
+        self.assertIn('Писем отправлено: 0', self.send())
+        Post.objects.create(text='новый пост', author=self.other)
+        self.send()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('новый пост', mail.outbox[0].body)
+        self.assertNotIn('первый пост', mail.outbox[0].body)
+
+    def test_window_for_first_digest(self):
+        """Без прошлого письма собираются посты только за окно"""
+        Post.objects.update(pub_date=timezone.now() - timedelta(hours=2))
+        self.send(window=60 * 60)
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(Digest.objects.exists())
+
+    def test_recent_posts_wait(self):
+        with mock.patch.object(digest, 'SETTLE', 60):
+            self.send()
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(DIGEST_POSTS=1)
+    def test_long_digest_links_feed(self):
+        self.send()
+        body = mail.outbox[0].body
+        self.assertIn('Новых постов в ваших подписках: 2', body)
+        self.assertIn(reverse('posts:follow_index'), body)
+
+    def test_batches_share_connection(self):
+        """Пачки уходят через одно соединение, по пачке за вызов"""
+        connection = mail.get_connection()
+        with mock.patch.object(
+                connection, 'send_messages',
+                wraps=connection.send_messages) as send_messages:
+            self.assertEqual(
+                digest.send(batch_size=1, connection=connection), 2)
+        self.assertEqual(send_messages.call_count, 2)
+        self.assertEqual(Digest.objects.count(), 2)
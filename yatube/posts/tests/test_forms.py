@@ -1,8 +1,18 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from jobs import queue
+from posts import thumbnails
 from posts.forms import PostForm
 from posts.models import Comment, Post, User
-from django.test import Client, TestCase
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings)
 from django.urls import reverse
 
 User = get_user_model()
@@ -101,3 +111,154 @@ class PostsCreateFormTests(TestCase):
         )
         new_comments_count = Comment.objects.count()
         self.assertEqual(new_comments_count, self.comments_count)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ThumbnailsTest(TransactionTestCase):
+    # генерация запускается после коммита, поэтому без обёртки в транзакцию
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username='thumbnail_author')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_thumbnails_are_generated_on_create(self):
+        """Миниатюры создаются при сохранении и выводятся на странице"""
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'пост с картинкой',
+            'image': SimpleUploadedFile('thumb.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='пост с картинкой')
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, thumbnail.url)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_cached_feed_shows_thumbnail_after_generation(self):
+        """Лента, закэшированная до миниатюры, обновляется после неё"""
+        cache.clear()
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'пост в очереди',
+            'image': SimpleUploadedFile('queued.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='пост в очереди')
+        url = reverse('posts:profile', args=[self.user.username])
+        response = self.client.get(url)
+        self.assertContains(response, post.image.url)
+        queue.work()
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, post.image.url)
+
+    def test_missing_thumbnail_falls_back_to_image(self):
+        """Без миниатюры показывается исходная картинка, а не задача"""
+        image = SimpleUploadedFile('plain.gif', SMALL_GIF, 'image/gif')
+        post = Post(text='без миниатюр', author=self.user)
+        post.image.save(image.name, image, save=False)
+        Post.objects.bulk_create([post])
+        post = Post.objects.get(text='без миниатюр')
+        self.assertIsNone(thumbnails.lookup(post.image, 'card'))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, post.image.url)
+        # просмотр не ставит генерацию: с JOBS_EAGER она бы уже прошла
+        self.assertIsNone(thumbnails.lookup(post.image, 'card'))
+
+    def test_pregenerate_command(self):
+        """Команда создаёт миниатюры уже загруженных картинок"""
+        image = SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif')
+        post = Post(text='старый пост', author=self.user)
+        post.image.save(image.name, image, save=False)
+        Post.objects.bulk_create([post])
+        out = StringIO()
+        call_command('pregenerate_thumbnails', workers=1, stdout=out)
+        self.assertIn('с ошибками: 0', out.getvalue())
+        self.assertIsNotNone(thumbnails.lookup(post.image, 'card'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='upload_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, content, name='upload.gif'):
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={
+                'text': 'пост с загрузкой',
+                'image': SimpleUploadedFile(name, content, 'image/gif'),
+            })
+        return response
+
+    @override_settings(POST_IMAGE_MAX_SIZE=len(SMALL_GIF) - 1)
+    def test_oversize_upload_is_rejected(self):
+        """Файл больше лимита отбрасывается с ошибкой формы"""
+        response = self.upload(SMALL_GIF)
+        self.assertIn(
+            'Размер файла', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.filter(text='пост с загрузкой').exists())
+
+    @override_settings(POST_IMAGE_MAX_DIMENSIONS=(1, 1))
+    def test_dimensions_are_checked_by_header(self):
+        """Размеры картинки проверяются по заголовку"""
+        response = self.upload(SMALL_GIF)
+        self.assertIn('2x1', response.context['form'].errors['image'][0])
+
+    def test_not_an_image_is_rejected(self):
+        """Файл, не являющийся картинкой, не принимается"""
+        response = self.upload(b'not an image at all', name='fake.gif')
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_limit_is_not_global(self):
+        """Ограниченный обработчик ставится только формам постов"""
+        self.assertNotIn(
+            'posts.uploads.LimitedTemporaryFileUploadHandler',
+            settings.FILE_UPLOAD_HANDLERS)
+
+    def test_post_forms_keep_csrf_check(self):
+        """CSRF у форм постов проверяется и без middleware"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        for url in (
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[
+                Post.objects.create(text='пост', author=self.user).pk]),
+        ):
+            with self.subTest(url=url):
+                response = client.post(url, {'text': 'x'})
+                self.assertTemplateUsed(response, 'core/403csrf.html')
+
+    def test_valid_image_is_saved(self):
+        """Подходящая картинка сохраняется"""
+        self.upload(SMALL_GIF)
+        post = Post.objects.get(text='пост с загрузкой')
+        self.assertTrue(post.image.name.startswith('posts/upload'))
@@ -0,0 +1,267 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import export
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='import_author')
+        cls.reader = User.objects.create_user(username='import_reader')
+        cls.group = Group.objects.create(
+            title='Импорт', slug='import', description='')
+        cls.source = tempfile.mkdtemp()
+        with open(os.path.join(cls.source, 'cat.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(cls.source, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'w', encoding='utf-8') as data:
+            data.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'import_posts', path, stdout=out, stderr=err,
+            images_dir=self.source, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_ndjson_import(self):
+        """NDJSON: посты с датами и картинками, подписки, ошибки строк"""
+        lines = [
+            {'author': 'import_author', 'group': 'import', 'text': 'первый',
+             'pub_date': '2020-01-02T03:04:05', 'image': 'cat.gif'},
+            {'author': 'import_author', 'text': 'второй'},
+            {'type': 'follow', 'user': 'import_reader',
+             'author': 'import_author'},
+            {'author': 'nobody', 'text': 'без автора'},
+            {'author': 'import_author', 'text': 'x', 'image': '../etc'},
+        ]
+        path = self.write('posts.ndjson', '\n'.join(
+            json.dumps(line, ensure_ascii=False) for line in lines
+        ) + '\nне json\n')
+        out, err = self.run_import(path, batch_size=2)
+        self.assertIn('Постов: 2, комментариев: 0, подписок: 1', out)
+        self.assertIn('пропущено: 3', out)
+        self.assertIn("нет автора 'nobody'", err)
+        first = Post.objects.get(text='первый')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.group, self.group)
+        self.assertTrue(first.image.name.startswith('posts/cat'))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2)
+
+    def test_csv_import_with_comments(self):
+        """CSV: комментарии ссылаются на id поста в файле, новые авторы"""
+        existing = Post.objects.create(author=self.author, text='в базе')
+        path = self.write('comments.csv', (
+            'type,id,post,author,text\n'
+            f'post,{existing.pk + 100},,import_author,для комментов\n'
+            f'comment,,{existing.pk + 100},import_reader,спасибо\n'
+            f'comment,,{existing.pk + 100},newcomer,и мне\n'
+            f'comment,,{existing.pk},import_reader,не к посту из файла\n'
+        ))
+        out, err = self.run_import(path, create_missing=True, batch_size=2)
+        self.assertIn('комментариев: 2', out)
+        self.assertIn('пропущено: 1', out)
+        post = Post.objects.get(text='для комментов')
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        self.assertFalse(existing.comments.exists())
+        self.assertTrue(User.objects.filter(username='newcomer').exists())
+
+    def test_comments_after_many_posts(self):
+        """Комментарии находят посты, даже если постов больше LookupMap"""
+        total = 10005
+        lines = [
+            json.dumps({'id': number, 'author': 'import_author',
+                        'text': f'пост {number}'})
+            for number in range(1, total + 1)
+        ] + [
+            json.dumps({'type': 'comment', 'post': number,
+                        'author': 'import_reader', 'text': f'к {number}'})
+            for number in (1, total)
+        ]
+        path = self.write('many.ndjson', '\n'.join(lines))
+        out, err = self.run_import(path, batch_size=5000)
+        self.assertIn('комментариев: 2, подписок: 0, пропущено: 0', out)
+        self.assertEqual(
+            Comment.objects.get(text='к 1').post.text, 'пост 1')
+        self.assertEqual(
+            Comment.objects.get(text=f'к {total}').post.text, f'пост {total}')
+
+    def test_follow_count_excludes_existing(self):
+        """Уже существующие и повторные подписки не считаются"""
+        other = User.objects.create_user(username='import_other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        lines = [
+            {'type': 'follow', 'user': 'import_reader',
+             'author': 'import_author'},
+            {'type': 'follow', 'user': 'import_reader',
+             'author': 'import_other'},
+            {'type': 'follow', 'user': 'import_reader',
+             'author': 'import_other'},
+        ]
+        path = self.write('follows.ndjson', '\n'.join(
+            json.dumps(line) for line in lines))
+        out, err = self.run_import(path)
+        self.assertIn('подписок: 1,', out)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 2)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=other).exists())
+
+    def test_rollback_removes_copied_images(self):
+        """Если пачка откатилась, скопированные картинки удаляются"""
+        path = self.write('broken.ndjson', json.dumps({
+            'author': 'import_author', 'text': 'с картинкой',
+            'image': 'cat.gif',
+        }))
+        images = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        os.makedirs(images, exist_ok=True)
+        before = set(os.listdir(images))
+        with mock.patch.object(
+                Follow.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path)
+        self.assertFalse(Post.objects.filter(text='с картинкой').exists())
+        self.assertEqual(set(os.listdir(images)), before)
+
+
+@mock.patch.object(export, 'SETTLE', 0)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='export_author')
+        cls.staff = User.objects.create_user(
+            username='export_staff', is_staff=True)
+        Follow.objects.create(user=cls.staff, author=cls.author)
+        cls.old = Post.objects.create(author=cls.author, text='старый')
+        Comment.objects.create(
+            post=cls.old, author=cls.staff, text='комментарий к старому')
+        cls.new = Post.objects.create(author=cls.author, text='новый')
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - timezone.timedelta(days=10))
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_incremental_export_with_state(self):
+        """Вторая выгрузка с --state отдаёт только новые записи"""
+        state = os.path.join(self.directory, 'state.json')
+        output = os.path.join(self.directory, 'posts.ndjson')
+        since = (timezone.now() - timezone.timedelta(days=1)).isoformat()
+        call_command(
+            'export_posts', kind=['post'], since=since, state=state,
+            output=output, stderr=StringIO())
+        with open(output) as data:
+            texts = [json.loads(line)['text'] for line in data]
+        self.assertEqual(texts, ['новый'])
+        call_command(
+            'export_posts', kind=['post'], state=state, output=output,
+            stderr=StringIO())
+        with open(output) as data:
+            self.assertEqual(data.read(), '')
+
+    def export_texts(self, state, kind='post'):
+        output = os.path.join(self.directory, f'{kind}.ndjson')
+        call_command(
+            'export_posts', kind=[kind], state=state, output=output,
+            stderr=StringIO())
+        with open(output) as data:
+            return [json.loads(line)['text'] for line in data]
+
+    def test_incremental_export_keeps_ties(self):
+        """Запись с той же датой, что и граница, попадает в следующую"""
+        state = os.path.join(self.directory, 'ties.json')
+        self.assertEqual(self.export_texts(state), ['старый', 'новый'])
+        Post.objects.create(author=self.author, text='ровесник')
+        Post.objects.filter(text='ровесник').update(
+            pub_date=Post.objects.get(pk=self.new.pk).pub_date)
+        self.assertEqual(self.export_texts(state), ['ровесник'])
+        self.assertEqual(self.export_texts(state), [])
+
+    def test_recent_rows_wait_for_next_export(self):
+        """Записи моложе SETTLE не сдвигают границу и выгрузятся потом"""
+        state = os.path.join(self.directory, 'settle.json')
+        with mock.patch.object(export, 'SETTLE', 60):
+            self.assertEqual(self.export_texts(state), ['старый'])
+        self.assertEqual(self.export_texts(state), ['новый'])
+
+    def test_date_only_state_is_read(self):
+        """Состояние прежнего формата -- граница по одной дате"""
+        state = os.path.join(self.directory, 'old.json')
+        since = timezone.now() - timezone.timedelta(days=1)
+        with open(state, 'w') as state_file:
+            json.dump({'post': since.isoformat()}, state_file)
+        self.assertEqual(self.export_texts(state), ['новый'])
+
+    def test_csv_round_trip(self):
+        """Выгрузку CSV можно загрузить обратно через import_posts"""
+        output = os.path.join(self.directory, 'posts.csv')
+        call_command(
+            'export_posts', format='csv', output=output, stderr=StringIO())
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        call_command('import_posts', output, stdout=StringIO())
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['новый', 'старый'])
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, 'комментарий к старому')
+        self.assertEqual(comment.post.text, 'старый')
+        self.assertNotEqual(comment.post_id, self.old.pk)
+        self.assertTrue(Follow.objects.filter(
+            user=self.staff, author=self.author).exists())
+
+    def test_endpoint_streams_gzip_to_staff(self):
+        """Эндпоинт отдаёт сжатый поток только персоналу"""
+        url = reverse('export_data')
+        self.assertEqual(Client().get(url).status_code, 302)
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(url, {'kind': 'post', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['text'], 'старый')
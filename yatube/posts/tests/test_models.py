@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -30,3 +34,83 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = post.text
         self.assertEqual(expected_object_name, str(post))
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.values(
+            'posts_count', 'comments_count',
+            'followers_count', 'following_count',
+        ).get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Пост'})
+        post = Post.objects.get()
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'})
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}))
+        self.assertEqual(self.stats(self.author), {
+            'posts_count': 1, 'comments_count': 0,
+            'followers_count': 1, 'following_count': 0,
+        })
+        self.assertEqual(self.stats(self.reader), {
+            'posts_count': 0, 'comments_count': 1,
+            'followers_count': 0, 'following_count': 1,
+        })
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}))
+        post.delete()
+        self.assertEqual(self.stats(self.author)['posts_count'], 0)
+        self.assertEqual(self.stats(self.author)['followers_count'], 0)
+        self.assertEqual(self.stats(self.reader)['comments_count'], 0)
+
+    def test_profile_shows_stored_counter(self):
+        """Профиль берёт число постов из счётчика, а не из COUNT(*)"""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        self.assertEqual(response.context['author_stats'].posts_count, 42)
+
+    def test_profile_without_stats_row_does_not_write(self):
+        """Без строки счётчиков профиль считает их, но не сохраняет"""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.all().delete()
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        self.assertEqual(response.context['author_stats'].posts_count, 1)
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_rebuild_command_repairs_drift(self):
+        """rebuild_author_stats находит и исправляет расхождения"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.bulk_create(
+            [Comment(author=self.reader, post=post, text='без сигналов')])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)])
+        out = StringIO()
+        call_command('rebuild_author_stats', '--check', stdout=out)
+        self.assertIn('расходятся: 2', out.getvalue())
+        self.assertEqual(self.stats(self.author)['followers_count'], 0)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.reader), {
+            'posts_count': 0, 'comments_count': 1,
+            'followers_count': 0, 'following_count': 1,
+        })
+        self.assertEqual(self.stats(self.author)['followers_count'], 1)
@@ -1,17 +1,24 @@
 import math
 import shutil
 import tempfile
+from io import StringIO
 
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from jobs import queue
+from jobs.models import Job
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post, TimelineEntry
 from ..forms import PostForm
 
 User = get_user_model()
@@ -59,6 +66,7 @@ class PostViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -89,21 +97,31 @@ class PostViewsTests(TestCase):
                 self.assertTemplateUsed(response, template)
 
     def test_index_page_cache(self):
-        """страница index кэшируется"""
-        cache.clear()
+        """страница index кэшируется и сбрасывается при новом посте"""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
+        # запись в обход сигналов не сбрасывает кэш
+        Post.objects.filter(pk=self.post.pk).update(text='тихая правка')
+        old_response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(old_response.content, posts)
         Post.objects.create(
             text='запись для проверки кэша',
             author=self.user,
         )
-        old_response = self.authorized_client.get(reverse('posts:index'))
-        old_posts = old_response.content
-        self.assertEqual(old_posts, posts)
-        cache.clear()
         new_response = self.authorized_client.get(reverse('posts:index'))
-        new_posts = new_response.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertNotEqual(new_response.content, posts)
+        self.assertContains(new_response, 'запись для проверки кэша')
+
+    def test_follow_page_cache_is_personal(self):
+        """кэш ленты подписок не отдаёт чужую страницу"""
+        reader = User.objects.create_user(username='reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        Follow.objects.create(user=reader, author=self.user)
+        response = reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, self.post.text)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, self.post.text)
 
     def check_context(self, context):
         self.assertEqual(context.pk, PostViewsTests.post.pk)
@@ -258,6 +276,122 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context['page_obj']), settings.N_POSTS)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='bilbo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=n, group=cls.group)
+            for n in range(settings.N_TESTPOST)
+        ])
+        # bulk_create ставит всем постам почти одинаковую дату,
+        # порядок страниц держится на pk
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_next_and_previous_cursors(self):
+        """Курсоры ведут на следующую и обратно на первую страницу"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'slug_slug'}),
+            reverse('posts:profile', kwargs={'username': 'bilbo'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(
+                    list(first), self.posts[:settings.N_POSTS])
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    url, {'after': first.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    list(second), self.posts[settings.N_POSTS:])
+                self.assertFalse(second.has_next())
+                self.assertTrue(second.has_previous())
+                back = self.client.get(
+                    url, {'before': second.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        """Страница с курсором не выполняет COUNT(*) и OFFSET"""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:index'),
+                {'after': first.paginator.next_cursor}
+            )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу"""
+        response = self.client.get(reverse('posts:index'), {'after': 'xx'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.posts[:settings.N_POSTS]
+        )
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов ленты не зависит от количества постов на странице"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='frodo', first_name='Фродо', last_name='Бэггинс')
+        cls.reader = User.objects.create_user(username='sam')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.pages = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': 'slug_slug'}): 4,
+            reverse('posts:profile', kwargs={'username': 'frodo'}): 5,
+            reverse('posts:follow_index'): 3,
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def create_posts(self, number):
+        Post.objects.bulk_create([
+            Post(author=self.author, text=n, group=self.group)
+            for n in range(number)
+        ])
+
+    def check_queries(self, posts_on_page):
+        for url, queries in self.pages.items():
+            with self.subTest(url=url, posts_on_page=posts_on_page):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), posts_on_page)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        self.create_posts(1)
+        self.check_queries(1)
+        self.create_posts(settings.N_POSTS)
+        self.check_queries(settings.N_POSTS)
+
+
 class FollowViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -307,3 +441,408 @@ class FollowViewsTest(TestCase):
             reverse('posts:follow_index'))
         context_unfollower = response.context.get('page_obj').object_list
         self.assertNotIn(self.new_post, context_unfollower)
+
+
+# eager-задачи выполняются после коммита, а TestCase не коммитит
+@override_settings(FOLLOW_TIMELINE=True, JOBS_EAGER=True)
+class TimelineViewsTest(TransactionTestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='timeline_reader')
+        self.author = User.objects.create_user(username='timeline_author')
+        self.star = User.objects.create_user(username='timeline_star')
+        self.old_post = Post.objects.create(
+            text='пост до подписки', author=self.author)
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'].object_list)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка докладывает старые посты, новые раскладываются"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='новый пост', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_fan_out_waits_for_worker(self):
+        """Без JOBS_EAGER ленты раскладывает воркер, а не запрос"""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        new_post = Post.objects.create(text='новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_posts_are_pulled(self):
+        """Посты популярного автора не рассылаются, а подтягиваются"""
+        Follow.objects.create(user=self.reader, author=self.star)
+        star_post = Post.objects.create(text='для всех', author=self.star)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [star_post])
+
+    def test_timeline_pages_match_follow_feed(self):
+        """Курсорные страницы ленты совпадают с обычной лентой подписок"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.bulk_create(
+            Post(text=f'пост {n}', author=self.author)
+            for n in range(settings.N_POSTS + 3)
+        )
+        call_command('check_timelines', repair=True, stdout=StringIO())
+        response = self.client.get(reverse('posts:follow_index'))
+        first = list(response.context['page_obj'].object_list)
+        cursor = response.context['page_obj'].paginator.next_cursor
+        response = self.client.get(
+            reverse('posts:follow_index'), {'after': cursor})
+        second = list(response.context['page_obj'].object_list)
+        expected = list(Post.objects.filter(author=self.author).order_by(
+            '-pub_date', '-pk'))
+        self.assertEqual(first + second, expected)
+
+    def test_check_timelines_repairs(self):
+        """check_timelines находит и чинит расхождения с подписками"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        star_post = Post.objects.create(text='чужой пост', author=self.star)
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.reader, post=star_post,
+            author=self.star, pub_date=star_post.pub_date)
+        out = StringIO()
+        call_command('check_timelines', stdout=out)
+        self.assertIn('не хватает 1, лишних 1', out.getvalue())
+        call_command('check_timelines', repair=True, stdout=StringIO())
+        out = StringIO()
+        call_command('check_timelines', stdout=out)
+        self.assertIn('Лент с расхождениями: 0', out.getvalue())
+
+
+class SearchViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seeker')
+        self.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Всё про котов')
+        self.exact = Post.objects.create(
+            author=self.user, text='Кошка спит на окне')
+        self.diluted = Post.objects.create(
+            author=self.user,
+            text='Долгий рассказ о погоде, огороде, соседях и кошка')
+        self.other = Post.objects.create(author=self.user, text='Собака лает')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_results_are_ranked(self):
+        """Находятся посты со всеми словами, релевантные выше"""
+        page = self.search('КОШКА').context['page_obj']
+        self.assertEqual(list(page), [self.exact, self.diluted])
+        page = self.search('кошка окне').context['page_obj']
+        self.assertEqual(list(page), [self.exact])
+        self.assertFalse(self.search('').context['page_obj'])
+
+    def test_index_follows_edits(self):
+        """Правка и удаление поста сразу видны в поиске"""
+        self.other.text = 'Кошка лает'
+        self.other.save()
+        self.assertIn(self.other, self.search('кошка').context['page_obj'])
+        self.assertFalse(self.search('собака').context['page_obj'])
+        self.exact.delete()
+        self.assertNotIn(self.exact, self.search('кошка').context['page_obj'])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS в запросе не ломают страницу"""
+        response = self.search('"кошка* OR (NEAR')
+        self.assertEqual(list(response.context['page_obj']), [])
+        self.assertIn(self.group, self.search('котов').context['groups'])
+
+    def test_pages_keep_query(self):
+        """Курсорные ссылки сохраняют запрос"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'кошка номер {n}')
+            for n in range(settings.N_POSTS + 2)
+        )
+        response = self.search('номер')
+        first = response.context['page_obj']
+        self.assertContains(
+            response, '?q=%D0%BD%D0%BE%D0%BC%D0%B5%D1%80&amp;after=')
+        second = self.search(
+            'номер', after=first.paginator.next_cursor).context['page_obj']
+        self.assertEqual(
+            {post.pk for post in list(first) + list(second)},
+            set(Post.objects.filter(
+                text__startswith='кошка номер').values_list('pk', flat=True)))
+
+    def test_reindex_restores_lost_triggers(self):
+        """reindex_search возвращает триггеры и доиндексирует посты"""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        post = Post.objects.create(author=self.user, text='потерянный')
+        self.assertFalse(self.search('потерянный').context['page_obj'])
+        call_command('reindex_search', optimize=True, stdout=StringIO())
+        self.assertEqual(
+            list(self.search('потерянный').context['page_obj']), [post])
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='speaker')
+        cls.post = Post.objects.create(author=cls.author, text='Обсуждаем')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{n}') for n in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(
+                post=self.post, author=self.readers[n % 3],
+                text=f'комментарий {n}')
+            for n in range(count)
+        )
+
+    def detail(self, **params):
+        return self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]), params)
+
+    def test_first_page_is_bounded(self):
+        """На странице поста не больше N_COMMENTS комментариев"""
+        self.add_comments(settings.N_COMMENTS + 5)
+        comments = self.detail().context['comments']
+        self.assertEqual(len(comments), settings.N_COMMENTS)
+        self.assertTrue(comments.has_next())
+
+    def test_queries_do_not_depend_on_comments(self):
+        """Авторы комментариев не догружаются по одному"""
+        self.add_comments(2)
+        with CaptureQueriesContext(connection) as few:
+            self.detail()
+        cache.clear()
+        self.add_comments(settings.N_COMMENTS)
+        with CaptureQueriesContext(connection) as many:
+            self.detail()
+        self.assertEqual(len(many), len(few))
+
+    def test_fragment_and_json_continue_feed(self):
+        """Фрагмент и JSON отдают следующие пачки по курсору"""
+        self.add_comments(settings.N_COMMENTS + 5)
+        first = self.detail().context['comments']
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        cursor = first.paginator.next_cursor
+        fragment = self.client.get(url, {'after': cursor})
+        self.assertEqual(len(fragment.context['comments']), 5)
+        self.assertNotContains(fragment, 'js-more-comments')
+        data = self.client.get(url, {'after': cursor, 'format': 'json'})
+        data = data.json()
+        self.assertIsNone(data['next'])
+        shown = [comment.pk for comment in first]
+        shown += [comment['id'] for comment in data['comments']]
+        self.assertEqual(
+            shown,
+            list(self.post.comments.order_by('-created', '-pk').values_list(
+                'pk', flat=True)))
+        self.assertContains(self.detail(), 'data-fragment')
+
+    def test_unknown_post_comments_404(self):
+        """Комментарии несуществующего поста -- 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.reader = User.objects.create_user(username='etag_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag-group', description='')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+
+    def test_anonymous_pages_are_public_and_revalidate(self):
+        """Анонимам -- публичный кэш и 304 без запросов к базе"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn(
+                    f'max-age={settings.FEED_HTTP_MAX_AGE}',
+                    response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                self.assertTrue(response.has_header('Last-Modified'))
+                # для страницы поста нужен один запрос: автор поста
+                queries = 1 if url == self.urls()[-1] else 0
+                with self.assertNumQueries(queries):
+                    cached = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertIn('public', cached['Cache-Control'])
+
+    def test_new_post_changes_etag(self):
+        """Новый пост автора меняет ETag всех его страниц"""
+        etags = [self.client.get(url)['ETag'] for url in self.urls()]
+        Post.objects.create(
+            author=self.author, group=self.group, text='Второй пост')
+        for url, etag in zip(self.urls(), etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_author_rename_changes_etag(self):
+        """Новое имя автора меняет ETag страниц, где оно видно"""
+        etags = [self.client.get(url)['ETag'] for url in self.urls()]
+        self.author.first_name = 'Переименованный'
+        self.author.save()
+        queue.work()
+        for url, etag in zip(self.urls(), etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Переименованный')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_group_edit_changes_etag(self):
+        """Новое название группы меняет ETag её страницы и постов"""
+        urls = self.urls()[1::2]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        self.group.title = 'Новое название'
+        self.group.save()
+        queue.work()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Новое название')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_login_does_not_touch_feeds(self):
+        self.client.force_login(self.author)
+        self.assertFalse(Job.objects.exists())
+
+    def test_logged_in_pages_are_private(self):
+        """Личные страницы не попадают в общие кэши"""
+        url = reverse('posts:profile', args=[self.author.username])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        followed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(followed.status_code, 200)
+        self.assertTrue(followed.context['following'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_cache_without_storage(self):
+        """Без хранимых поколений страницы не отвечают 304"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                repeated = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(repeated.status_code, 200)
+
+    def test_missing_pages_are_not_cached(self):
+        """404 не получает заголовков кэширования"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.other = User.objects.create_user(username='other_author')
+        cls.group = Group.objects.create(
+            title='Первая', slug='first-group', description='')
+        cls.other_group = Group.objects.create(
+            title='Вторая', slug='second-group', description='')
+        Post.objects.create(author=cls.author, group=cls.group, text='раз')
+        Post.objects.create(
+            author=cls.other, group=cls.other_group, text='два')
+
+    def setUp(self):
+        cache.clear()
+
+    def status(self, url):
+        return self.client.get(url)['X-Page-Cache']
+
+    def test_post_purges_only_affected_pages(self):
+        """Новый пост сбрасывает index, свою группу и профиль автора"""
+        affected = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        untouched = [
+            reverse('posts:group_list', args=[self.other_group.slug]),
+            reverse('posts:profile', args=[self.other.username]),
+        ]
+        for url in affected + untouched:
+            self.assertEqual(self.status(url), 'MISS')
+            self.assertEqual(self.status(url), 'HIT')
+        Post.objects.create(author=self.author, group=self.group, text='три')
+        for url in affected:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'MISS')
+                self.assertContains(response, 'три')
+        for url in untouched:
+            with self.subTest(url=url):
+                self.assertEqual(self.status(url), 'HIT')
+
+    def test_hit_matches_rendered_page(self):
+        """Из кэша отдаётся та же страница без обращения к базе"""
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_logged_in_and_disabled_bypass(self):
+        """Вошедшим и при выключенной настройке кэш не используется"""
+        url = reverse('posts:index')
+        with self.settings(ANONYMOUS_PAGE_CACHE=False):
+            self.assertEqual(self.status(url), 'BYPASS')
+        self.client.force_login(self.author)
+        self.assertEqual(self.status(url), 'BYPASS')
+        self.assertEqual(self.status(url), 'BYPASS')
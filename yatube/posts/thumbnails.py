@@ -0,0 +1,83 @@
+"""Заблаговременная генерация миниатюр картинок постов.
+
+При сохранении картинки все размеры из THUMBNAIL_GEOMETRIES создаются
+фоновой задачей (jobs), а шаблоны через {% post_thumbnail %} только
+находят готовую миниатюру в kvstore sorl. Если её ещё нет, страница
+показывает исходную картинку: просмотр ничего не режет и не пишет в
+базу. Такая страница попадает в кэш лент, поэтому после генерации
+сдвигаются поколения лент с постами этой картинки.
+"""
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue, task
+
+from . import feed_cache, tasks
+from .models import Post
+
+
+class LookupBackend(ThumbnailBackend):
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None; сама ничего не создаёт.
+
+        Опции дополняются так же, как в get_thumbnail, иначе имя файла
+        миниатюры не совпадёт.
+        """
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = LookupBackend()
+
+
+def lookup(name, geometry):
+    geometry_string, options = settings.THUMBNAIL_GEOMETRIES[geometry]
+    return backend.lookup(name, geometry_string, **options)
+
+
+@task('posts.thumbnails')
+def generate(name):
+    """Создаёт миниатюры всех размеров для файла name."""
+    for geometry_string, options in settings.THUMBNAIL_GEOMETRIES.values():
+        get_thumbnail(name, geometry_string, **options)
+    _bump_feeds(name)
+
+
+def _bump_feeds(name):
+    """Ленты, закэшированные с исходной картинкой вместо миниатюры."""
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'author_id', 'author__username', 'group__slug')
+    namespaces = set()
+    authors = set()
+    for pk, author_id, username, slug in posts:
+        namespaces.update(('index', f'post:{pk}', f'profile:{username}'))
+        if slug:
+            namespaces.add(f'group:{slug}')
+        authors.add(author_id)
+    if namespaces:
+        feed_cache.bump(*namespaces)
+    for author_id in authors:
+        enqueue(tasks.bump_followers, author_id)
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр name в очередь задач.
+
+    Ключ по имени файла: пока задача ждёт воркера, повторное сохранение
+    той же картинки не ставит вторую.
+    """
+    if name:
+        enqueue(generate, name, key=f'thumbnails:{name}')
@@ -0,0 +1,149 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Новый пост сразу раскладывается в TimelineEntry каждого подписчика, а
+при подписке в ленту докладываются старые посты автора. Тогда
+follow_index читает одну таблицу по индексу (user, pub_date) вместо
+соединения Follow с Post и сортировки.
+
+Авторов, у которых больше FOLLOW_TIMELINE_FANOUT_LIMIT подписчиков, не
+рассылаем: их посты подтягиваются при чтении и сливаются с лентой.
+Автор, переставший быть «тяжёлым», оставляет в лентах дыру за время,
+пока его не рассылали; её находит и заполняет check_timelines.
+"""
+from django.conf import settings
+from django.utils.functional import cached_property
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .utils import CursorPaginator
+
+CHUNK_SIZE = 1000
+
+
+def enabled():
+    return settings.FOLLOW_TIMELINE
+
+
+def is_heavy(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FOLLOW_TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def heavy_authors(user):
+    """Авторы из подписок user, чьи посты подтягиваются при чтении."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=(
+            settings.FOLLOW_TIMELINE_FANOUT_LIMIT),
+    ).values_list('author_id', flat=True))
+
+
+def _insert(entries):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) == CHUNK_SIZE:
+            TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+            chunk = []
+    if chunk:
+        TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_heavy(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True).iterator(chunk_size=CHUNK_SIZE)
+    _insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post.pk,
+            author_id=post.author_id, pub_date=post.pub_date,
+        )
+        for user_id in followers
+    )
+
+
+def backfill(user_id, author_id):
+    """Докладывает в ленту user_id уже опубликованные посты автора."""
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date').iterator(chunk_size=CHUNK_SIZE)
+    _insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    )
+
+
+def remove(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def check(user, repair=False):
+    """Сверяет ленту пользователя с подписками.
+
+    Возвращает число недостающих и лишних записей; с repair чинит их.
+    Записи «тяжёлых» авторов, сделанные до того, как они стали такими,
+    лишними не считаются: при чтении они просто совпадут с подтянутыми.
+    """
+    followed = Follow.objects.filter(user=user).values('author_id')
+    missing = (
+        Post.objects.filter(author_id__in=followed)
+        .exclude(author_id__in=heavy_authors(user))
+        .exclude(pk__in=TimelineEntry.objects.filter(
+            user=user).values('post_id'))
+    )
+    stale = TimelineEntry.objects.filter(user=user).exclude(
+        author_id__in=followed)
+    if not repair:
+        return missing.count(), stale.count()
+    missing = list(missing.values_list('pk', 'author_id', 'pub_date'))
+    _insert(
+        TimelineEntry(
+            user_id=user.pk, post_id=post_id,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in missing
+    )
+    stale_count, _ = stale.delete()
+    return len(missing), stale_count
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная пагинация по материализованной ленте user.
+
+    Курсоры те же (pub_date, id поста), поэтому ссылки совместимы с
+    обычной лентой подписок.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date', user=None):
+        super().__init__(object_list, per_page, key=key)
+        self.user = user
+
+    @cached_property
+    def heavy(self):
+        return heavy_authors(self.user)
+
+    def _slice(self, position, newer, offset, limit):
+        entries = self._keyset(
+            TimelineEntry.objects.filter(user=self.user),
+            position, newer, pk='post_id',
+        )
+        rows = set(entries.values_list(self.key, 'post_id')[:offset + limit])
+        if self.heavy:
+            pulled = self._keyset(
+                Post.objects.filter(author_id__in=self.heavy),
+                position, newer,
+            )
+            rows.update(pulled.values_list(self.key, 'pk')[:offset + limit])
+        rows = sorted(rows, reverse=not newer)[offset:offset + limit]
+        posts = {
+            self._pk(post): post for post in self.object_list.filter(
+                pk__in=[post_id for _, post_id in rows]).order_by()
+        }
+        return [posts[post_id] for _, post_id in rows if post_id in posts]
@@ -0,0 +1,115 @@
+"""Загрузка картинок постов с ограниченным расходом памяти.
+
+LimitedTemporaryFileUploadHandler пишет каждый файл на диск кусками по
+chunk_size и перестаёт принимать файл, как только тот превысил
+POST_IMAGE_MAX_SIZE. Форма получает вместо него RejectedUpload с
+причиной отказа. Формат и размеры картинки проверяются по заголовку
+(inspect_image) до того, как Pillow станет её разбирать целиком.
+
+Обработчик ставится только на формы постов (limit_uploads), остальные
+загрузки идут через FILE_UPLOAD_HANDLERS по умолчанию.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+INVALID_IMAGE = (
+    'Загрузите правильное изображение. Файл, который вы загрузили, '
+    'поврежден или не является изображением.'
+)
+
+
+class RejectedUpload(UploadedFile):
+    """Отброшенный при загрузке файл: содержимого нет, только причина."""
+
+    def __init__(self, name, reason):
+        super().__init__(name=name, size=0)
+        self.rejected = reason
+
+
+def _too_large():
+    limit = filesizeformat(settings.POST_IMAGE_MAX_SIZE)
+    return f'Размер файла не должен превышать {limit}.'
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Всегда пишет загрузку во временный файл и обрезает большие файлы.
+
+    Размер считается по пришедшим байтам, а не по заявленному клиентом;
+    заявленный используется только чтобы отказать сразу.
+    """
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 *args, **kwargs):
+        self.received = 0
+        self.rejected = None
+        if content_length and content_length > settings.POST_IMAGE_MAX_SIZE:
+            self.field_name, self.file_name = field_name, file_name
+            self.rejected = _too_large()
+            return
+        super().new_file(
+            field_name, file_name, content_type, content_length,
+            *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejected:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            self.rejected = _too_large()
+            # закрытие удаляет уже записанную часть
+            self.file.close()
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.rejected:
+            return RejectedUpload(self.file_name, self.rejected)
+        return super().file_complete(file_size)
+
+
+def limit_uploads(view):
+    """Вид принимает файлы через LimitedTemporaryFileUploadHandler.
+
+    Обработчики нельзя сменить после чтения request.POST, а
+    CsrfViewMiddleware читает его до вида. Поэтому middleware вид
+    пропускает, а CSRF проверяется внутри, уже после смены обработчиков.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [LimitedTemporaryFileUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+
+def inspect_image(file):
+    """Текст ошибки, если картинка не подходит, иначе None.
+
+    Image.open читает только заголовок, пиксели не декодируются, так что
+    проверка дешева даже для огромного файла.
+    """
+    try:
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return INVALID_IMAGE
+    finally:
+        file.seek(0)
+    if image_format not in settings.POST_IMAGE_FORMATS:
+        formats = ', '.join(settings.POST_IMAGE_FORMATS)
+        return f'Поддерживаются только форматы {formats}.'
+    max_width, max_height = settings.POST_IMAGE_MAX_DIMENSIONS
+    if width > max_width or height > max_height:
+        return (
+            f'Изображение должно быть не больше {max_width}x{max_height} '
+            f'пикселей, а у загруженного {width}x{height}.'
+        )
+    return None
@@ -1,9 +1,190 @@
-from django.core.paginator import Paginator
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import feed_cache
+
+
+@contextmanager
+def explicit_dates(model, *field_names):
+    """Временно отключает auto_now/auto_now_add у полей модели.
+
+    Нужно массовым загрузкам: иначе bulk_create перезапишет переданные
+    даты текущим временем. Действует на весь процесс, поэтому годится
+    только для management-команд.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def encode_cursor(value, pk):
+    """Упаковывает позицию (значение ключа, pk) в непрозрачный токен."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return urlsafe_base64_encode(force_bytes(json.dumps([value, pk])))
+
+
+def decode_cursor(token):
+    """Обратное к encode_cursor; для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        value, pk = json.loads(force_str(urlsafe_base64_decode(token)))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (key, pk) без COUNT(*) и OFFSET.
+
+    Страницы адресуются курсорами ?after=/?before=, общее число записей
+    не вычисляется, поэтому count и num_pages описывают только
+    просмотренное окно: их хватает, чтобы Page.has_next/has_previous
+    работали как обычно.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date'):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+        self._seen = 0
+
+    @property
+    def count(self):
+        return self._seen
+
+    @property
+    def num_pages(self):
+        return self._number + self._has_next
+
+    def _field(self):
+        """Поле ключа: поле модели или output_field аннотации."""
+        try:
+            return self.object_list.model._meta.get_field(self.key)
+        except FieldDoesNotExist:
+            annotation = self.object_list.query.annotations.get(self.key)
+            return annotation and annotation.output_field
+
+    def _position(self, cursor):
+        value, pk = cursor
+        field = self._field()
+        if field is None:
+            return value, pk
+        try:
+            return field.to_python(value), int(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def _keyset(self, queryset, position, newer, pk='pk'):
+        """queryset по порядку ключа, начиная сразу за позицией."""
+        prefix = '' if newer else '-'
+        queryset = queryset.order_by(prefix + self.key, prefix + pk)
+        if position:
+            value, last = position
+            lookup = 'gt' if newer else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.key}__{lookup}': value})
+                | Q(**{self.key: value, f'{pk}__{lookup}': last})
+            )
+        return queryset
+
+    def _slice(self, position, newer, offset, limit):
+        """Строки за позицией: от новых к старым или, с newer, наоборот."""
+        queryset = self._keyset(self.object_list, position, newer)
+        return list(queryset[offset:offset + limit])
+
+    def _pk(self, row):
+        """pk строки: экземпляра модели или словаря из values()."""
+        if isinstance(row, dict):
+            return row[self.object_list.model._meta.pk.attname]
+        return row.pk
+
+    def _cursor(self, row):
+        value = row[self.key] if isinstance(row, dict) else getattr(
+            row, self.key)
+        return encode_cursor(value, self._pk(row))
+
+    def get_cursor_page(self, after=None, before=None, number=None):
+        """Возвращает страницу после/до курсора.
+
+        Без курсоров понимает старый параметр ?page=N, чтобы не ломать
+        сохранённые ссылки; он по-прежнему обходится без COUNT(*).
+        """
+        limit = self.per_page + 1
+        after = decode_cursor(after)
+        before = decode_cursor(before)
+        after = after and self._position(after)
+        before = before and self._position(before)
+        if before:
+            rows = self._slice(before, True, 0, limit)
+            if len(rows) == limit:
+                return self._make_page(rows[:self.per_page][::-1], 2, True)
+            # дошли до начала ленты: отдаём полноценную первую страницу
+            number = 1
+        if after:
+            number, offset = 2, 0
+        else:
+            try:
+                number = max(int(number or 1), 1)
+            except (TypeError, ValueError):
+                number = 1
+            offset = (number - 1) * self.per_page
+        rows = self._slice(after, False, offset, limit)
+        return self._make_page(
+            rows[:self.per_page], number, len(rows) == limit)
+
+    def _make_page(self, rows, number, has_next):
+        self._number = number
+        self._has_next = has_next
+        self._seen = (number - 1) * self.per_page + len(rows) + has_next
+        if rows and has_next:
+            self.next_cursor = self._cursor(rows[-1])
+        if rows and number > 1:
+            self.previous_cursor = self._cursor(rows[0])
+        return self._get_page(rows, number, self)
+
 
+def paginator_list(request, posts, key='pub_date', cache_key=None,
+                   paginator_class=CursorPaginator, per_page=None, **options):
+    """Страница ленты по параметрам запроса.
 
-def paginator_list(request, posts):
-    paginator = Paginator(posts, settings.N_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    С cache_key окно страницы (строки и признак продолжения) берётся
+    из кэша и туда же кладётся, так что закэшированная страница не
+    обращается к базе.
+    """
+    paginator = paginator_class(
+        posts, per_page or settings.N_POSTS, key=key, **options)
+    window = cache.get(cache_key) if cache_key else None
+    if window is not None:
+        return paginator._make_page(*window)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        number=request.GET.get('page'),
+    )
+    if cache_key:
+        cache.set(
+            cache_key,
+            (page_obj.object_list, page_obj.number, paginator._has_next),
+            feed_cache.timeout(),
+        )
     return page_obj
@@ -1,60 +1,165 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 
+from core import concurrency
+from core.database.routers import replica_reads
+
+from . import export, feed_cache, search, timeline
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Comment, Post, User
+from .models import AuthorStats, Follow, Group, Comment, Post, User
+from .uploads import limit_uploads
 from .utils import paginator_list
 
 
+def _profile_namespaces(request, username):
+    namespaces = (f'profile:{username}',)
+    if request.user.is_authenticated:
+        # кнопка подписки зависит от подписок читателя
+        namespaces += (f'follow:{request.user.pk}',)
+    return namespaces
+
+
+def _post_namespaces(request, post_id):
+    # на странице поста есть счётчик постов автора
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True).first()
+    if username is None:
+        return None
+    return f'post:{post_id}', f'profile:{username}'
+
+
+@replica_reads
+@feed_cache.feed_page(lambda request: ('index',))
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_list(request, posts)
+    cache_key = feed_cache.page_key('index', request, 'index')
+    posts = Post.objects.for_feed()
+    page_obj = paginator_list(request, posts, cache_key=cache_key)
     context = {
         'page_obj': page_obj,
     }
+    context.update(feed_cache.context(cache_key))
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@feed_cache.feed_page(lambda request, slug: (f'group:{slug}',))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_list(request, posts)
+    cache_key = feed_cache.page_key('group', request, f'group:{slug}')
+    posts = group.posts.for_feed()
+    page_obj = paginator_list(request, posts, cache_key=cache_key)
     context = {
         'group': group,
         'page_obj': page_obj,
     }
+    context.update(feed_cache.context(cache_key))
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@feed_cache.feed_page(_profile_namespaces)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_list(request, posts)
-    following = False
-    if request.user.is_authenticated:
-        if Follow.objects.filter(user=request.user).filter(author=author):
-            following = True
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    cache_key = feed_cache.page_key(
+        'profile', request, f'profile:{author.username}')
+    posts = author.posts.for_feed()
+    user = request.user if request.user.is_authenticated else None
+    # запросы друг от друга не зависят, с VIEW_WORKERS идут одновременно
+    page_obj, author_stats, following = concurrency.gather(
+        lambda: paginator_list(request, posts, cache_key=cache_key),
+        lambda: AuthorStats.objects.for_user(author),
+        lambda: user is not None and Follow.objects.filter(
+            user=user, author=author).exists(),
+    )
     context = {
         'author': author,
+        'author_stats': author_stats,
         'page_obj': page_obj,
         'following': following,
     }
+    context.update(feed_cache.context(cache_key))
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@feed_cache.feed_page(_post_namespaces)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
     form = CommentForm()
-    comments = Comment.objects.filter(post=post)
+    cache_key = feed_cache.page_key('post_detail', request, f'post:{post.pk}')
     context = {
         'post': post,
+        'author_stats': AuthorStats.objects.for_user(post.author),
         'form': form,
-        'comments': comments
+        'comments': _comments_page(request, post.pk, cache_key),
     }
+    context.update(feed_cache.context(cache_key))
     return render(request, 'posts/post_detail.html', context)
 
 
+def _comments_page(request, post_id, cache_key):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post_id', 'author__username')
+    return paginator_list(
+        request, comments, key='created', cache_key=cache_key,
+        per_page=settings.N_COMMENTS)
+
+
+def post_comments(request, post_id):
+    """Следующая пачка комментариев: HTML-фрагмент или ?format=json."""
+    cache_key = feed_cache.page_key(
+        'post_comments', request, f'post:{post_id}')
+    page_obj = _comments_page(request, post_id, cache_key)
+    if not page_obj and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    next_cursor = None
+    if page_obj.has_next():
+        next_cursor = page_obj.paginator.next_cursor
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in page_obj
+            ],
+            'next': next_cursor,
+        }, json_dumps_params={'ensure_ascii': False})
+    return render(request, 'includes/comment_list.html', {
+        'comments': page_obj,
+        'post_id': post_id,
+    })
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.posts(Post.objects.for_feed(), query)
+    page_obj = paginator_list(request, posts, key='rank')
+    context = {
+        'query': query,
+        'groups': search.groups(query),
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@limit_uploads
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -68,6 +173,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@limit_uploads
 @login_required
 def post_edit(request, post_id):
     is_edit = True
@@ -91,6 +197,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -102,17 +209,28 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_list(request, posts)
+    cache_key = feed_cache.page_key(
+        f'follow:{request.user.pk}', request, f'follow:{request.user.pk}')
+    if timeline.enabled():
+        page_obj = paginator_list(
+            request, Post.objects.for_feed(), cache_key=cache_key,
+            paginator_class=timeline.TimelinePaginator, user=request.user)
+    else:
+        posts = Post.objects.for_feed().filter(
+            author__following__user=request.user)
+        page_obj = paginator_list(request, posts, cache_key=cache_key)
     context = {
         'page_obj': page_obj,
     }
+    context.update(feed_cache.context(cache_key))
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -121,7 +239,33 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
+
+
+@staff_member_required
+def export_data(request):
+    """Выгрузка для аналитики: ?kind=post&format=csv&gzip=1&since=<ISO>."""
+    kinds = request.GET.getlist('kind') or export.KINDS
+    file_format = request.GET.get('format', 'ndjson')
+    if file_format not in export.FORMATS or set(kinds) - set(export.KINDS):
+        return HttpResponseBadRequest('Неизвестный тип или формат')
+    since = request.GET.get('since')
+    if since:
+        moment = parse_datetime(since)
+        if moment is None:
+            return HttpResponseBadRequest('Непонятная дата since')
+        since = dict.fromkeys(export.DATE_FIELDS, (moment, None))
+    compress = bool(request.GET.get('gzip'))
+    rows = export.records(kinds, since)
+    response = StreamingHttpResponse(
+        export.encode(export.FORMATS[file_format](rows), compress),
+        content_type='application/gzip' if compress else (
+            'text/csv' if file_format == 'csv' else 'application/x-ndjson'),
+    )
+    filename = f'yatube.{file_format}' + ('.gz' if compress else '')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, e.g. ``uvicorn yatube.asgi:application``. Django 2.2
+has no ASGI handler of its own: requests run through the WSGI handler
+in a thread pool of ASGI_THREADS workers (see core.asgi).
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(
+    get_wsgi_application(), workers=settings.ASGI_THREADS)
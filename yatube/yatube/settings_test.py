@@ -0,0 +1,16 @@
+"""Настройки тестов: manage.py test берёт их вместо yatube.settings."""
+import os
+
+from core.database.config import database_config
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+# отдельная SQLite-реплика без TEST MIRROR: у неё свои данные, и тесты
+# видят, из какой базы прочитана страница. С неё читают только тесты,
+# которые включают DATABASE_REPLICAS=['replica']
+DATABASES['replica'] = database_config(
+    None, os.path.join(BASE_DIR, 'replica.sqlite3'))['default']
+DATABASE_REPLICAS = []
+# задачи выполняются без воркера, после коммита транзакции
+JOBS_EAGER = True
@@ -3,10 +3,17 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import health, perf_stats
+from posts.views import export_data
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path('health/', health, name='health'),
+    path('admin/perf/', perf_stats, name='perf_stats'),
+    path('admin/export/', export_data, name='export_data'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls'))